@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 
@@ -21,4 +23,7 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse .env/environment once per process and reuse the Settings instance."""
+    return Settings()
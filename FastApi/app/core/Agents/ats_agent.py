@@ -8,7 +8,8 @@ from typing import List, Tuple, Optional
 
 from app.core.RAGANDEMBEDDINGS.embeddings import embed
 from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
-from app.core.RAGANDEMBEDDINGS.ats_data import ats_data
+from app.core.RAGANDEMBEDDINGS.seed import seed_kb
+from app.core.RAGANDEMBEDDINGS.ats_data import ATS_IDS, ATS_TEXTS, ats_data
 from app.core.Utils.llm_client import _call_gemini, _call_huggingface, _call_groq
 from app.models.ats import ATSAnalyzeOutput
 
@@ -21,16 +22,7 @@ def seed_ats_collection(name: str = COLLECTION_NAME) -> int:
 
     Returns number of documents currently in the collection after seeding.
     """
-    col = get_or_create_collection(name)
-    count = col.count()
-    if count > 0:
-        return count
-
-    texts = [item["text"] for item in ats_data]
-    ids = [item["id"] for item in ats_data]
-    embeddings = embed(texts)
-    col.add(documents=texts, ids=ids, embeddings=embeddings)
-    return col.count()
+    return seed_kb(name, ats_data, ids=ATS_IDS, texts=ATS_TEXTS).count()
 
 
 def retrieve_ats_context(resume_text: str, job_description: Optional[str] = None, n_results: int = 4) -> Tuple[List[str], List[str]]:
@@ -12,7 +12,7 @@ import re
 from typing import List, Dict, Any, Tuple, Optional
 from app.core.Utils.llm_client import call_chat
 from app.core.RAGANDEMBEDDINGS.embeddings import embed
-from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
+from app.core.RAGANDEMBEDDINGS.seed import seed_kb
 from app.core.RAGANDEMBEDDINGS.authenticity_rag_data import authenticity_knowledge
 from app.models.authenticity import (
     AuthenticityAnalysisInput,
@@ -455,13 +455,8 @@ async def analyze_authenticity(
     # Prepare lightweight RAG context (best-effort; non-fatal on failure)
     rag_snippets: List[Dict[str, str]] = []
     try:
-        col = get_or_create_collection("authenticity_knowledge")
-        if col.count() == 0:
-            # Seed knowledge base
-            texts = [x["text"] for x in authenticity_knowledge]
-            ids = [x["id"] for x in authenticity_knowledge]
-            emb = embed(texts)
-            col.add(documents=texts, ids=ids, embeddings=emb)
+        # Seed knowledge base
+        col = seed_kb("authenticity_knowledge", authenticity_knowledge)
 
         # Build simple query from resume content and claimed skills
         query_parts: List[str] = []
@@ -1,47 +1,93 @@
-import json
+import asyncio
+import functools
+import heapq
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 import os
 import httpx
+import orjson
 from fastapi import HTTPException
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 from app.core.Utils.llm_client import call_chat, _call_gemini, _call_groq
-from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
-from app.core.RAGANDEMBEDDINGS.embeddings import embed
-from app.core.RAGANDEMBEDDINGS.github_rag_data import github_knowledge
+from app.core.Utils.http_client import cached_get, get_client
+from app.core.RAGANDEMBEDDINGS.seed import seed_kb
+from app.core.RAGANDEMBEDDINGS.embeddings import embed_async
+from app.core.RAGANDEMBEDDINGS.github_rag_data import GITHUB_IDS, GITHUB_TEXTS, github_knowledge
+
+try:  # optional C parser, ~10x faster than the stdlib for GitHub's "...Z" timestamps
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    def _parse_iso(value: str) -> datetime:
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value)
 
 GITHUB_API = "https://api.github.com"
+GITHUB_MAX_CONCURRENCY = 20  # cap in-flight requests to stay under secondary rate limits
+RAW_ACCEPT = {"Accept": "application/vnd.github.raw"}  # README body as text, no base64 envelope
+_FENCE_RE = re.compile(r"^[ \t]*```[^\n]*\n?", re.MULTILINE)  # whole ``` / ```json fence lines
 
 
+def _auth_headers() -> Dict[str, str]:
+    """Request-scoped Authorization header (empty when no token is configured)."""
+    github_token = os.getenv("GITHUB_TOKEN") or os.getenv("GITHUB_PAT")
+    return {"Authorization": f"Bearer {github_token}"} if github_token else {}
+
+
+async def _gather_limited(
+    client: httpx.AsyncClient,
+    requests: List[Tuple[str, Dict[str, str]]],
+    limit: int = GITHUB_MAX_CONCURRENCY,
+):
+    """GET all (url, headers) pairs concurrently (at most `limit` in flight); exceptions are returned, not raised."""
+    sem = asyncio.Semaphore(limit)
+
+    async def _get(url: str, headers: Dict[str, str]):
+        async with sem:
+            return await cached_get(client, url, headers=headers)
+
+    return await asyncio.gather(*(_get(u, h) for u, h in requests), return_exceptions=True)
+
+
+# owner/repo from a URL, SSH remote or bare slug; trailing path segments (e.g. /tree/main) are ignored
+_REPO_RE = re.compile(
+    r"^(?:git@github\.com:|(?:(?:git|https?)://)?(?:www\.)?github\.com/)?"
+    r"(?P<owner>[^/\s]+)/(?P<repo>[^/\s#?]+)"
+)
+
+
+@functools.lru_cache(maxsize=4096)
 def parse_owner_repo(repo_url: str):
     """Normalize GitHub URL/slug into (owner, repo) or raise ValueError."""
     if not repo_url or not repo_url.strip():
         raise ValueError("Provide a GitHub repository URL or slug like owner/repo")
 
-    cleaned = repo_url.strip()
-    cleaned = cleaned.replace("git@github.com:", "github.com/")
-    cleaned = cleaned.replace("git://github.com/", "github.com/")
-    if cleaned.startswith("http://") or cleaned.startswith("https://"):
-        cleaned = cleaned.split("://", 1)[1]
-    cleaned = cleaned.lstrip("www.")
-    if cleaned.startswith("github.com/"):
-        cleaned = cleaned[len("github.com/"):]
-    cleaned = cleaned.rstrip("/").replace(".git", "")
-
-    parts = [p for p in cleaned.split("/") if p]
-    if len(parts) < 2:
+    match = _REPO_RE.match(repo_url.strip())
+    if not match:
+        raise ValueError("Provide a GitHub repository in the form owner/repo")
+
+    repo = match.group("repo")
+    if repo.endswith(".git"):
+        repo = repo[:-len(".git")]
+    if not repo:
         raise ValueError("Provide a GitHub repository in the form owner/repo")
 
-    return parts[0], parts[1]
+    return match.group("owner"), repo
 
 
 # -------------------- Seed RAG --------------------
+_seeded_collections: Dict[str, Any] = {}
+
+
 def seed_github_collection(name="github_knowledge"):
-    col = get_or_create_collection(name)
-    if col.count() == 0:
-        texts = [x["text"] for x in github_knowledge]
-        ids = [x["id"] for x in github_knowledge]
-        emb = embed(texts)
-        col.add(documents=texts, ids=ids, embeddings=emb)
+    # Seeding is checked once per process; later calls reuse the cached handle
+    col = _seeded_collections.get(name)
+    if col is not None:
+        return col
+    col = seed_kb(name, github_knowledge, ids=GITHUB_IDS, texts=GITHUB_TEXTS)
+    _seeded_collections[name] = col
     return col
 
 
@@ -58,60 +104,58 @@ async def fetch_github_repo(repo_url: str):
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
-    github_token = os.getenv("GITHUB_TOKEN") or os.getenv("GITHUB_PAT")
-    base_headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "fastapi/1.0",
-    }
-    if github_token:
-        base_headers["Authorization"] = f"Bearer {github_token}"
+    auth_headers = _auth_headers()
 
-    async with httpx.AsyncClient(timeout=30, headers=base_headers) as client:
-        try:
-            repo_resp = await client.get(f"{GITHUB_API}/repos/{owner}/{repo}")
-            repo_resp.raise_for_status()
-            repo_data = repo_resp.json()
-        except httpx.HTTPStatusError as exc:
-            status = exc.response.status_code if exc.response else 500
-            if status == 403:
-                detail = "GitHub API returned 403 (rate limit or private repo). Set GITHUB_TOKEN/GITHUB_PAT for authenticated requests."
-            else:
-                detail = f"GitHub API returned {status} for {owner}/{repo}"
-            raise HTTPException(status_code=status, detail=detail)
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=502, detail=f"GitHub API request failed: {exc}")
-
-        readme_data = {}
-        try:
-            readme_resp = await client.get(f"{GITHUB_API}/repos/{owner}/{repo}/readme")
-            if readme_resp.is_success:
-                readme_data = readme_resp.json()
-        except Exception:
-            readme_data = {}
+    client = get_client()
+    try:
+        repo_resp = await cached_get(client, f"{GITHUB_API}/repos/{owner}/{repo}", headers=auth_headers)
+        repo_resp.raise_for_status()
+        repo_data = repo_resp.json()
+    except httpx.HTTPStatusError as exc:
+        status = exc.response.status_code if exc.response else 500
+        if status == 403:
+            detail = "GitHub API returned 403 (rate limit or private repo). Set GITHUB_TOKEN/GITHUB_PAT for authenticated requests."
+        else:
+            detail = f"GitHub API returned {status} for {owner}/{repo}"
+        raise HTTPException(status_code=status, detail=detail)
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"GitHub API request failed: {exc}")
+
+    # readme, languages and commits are independent — fetch them concurrently
+    readme_resp, langs_resp, commits_resp = await asyncio.gather(
+        cached_get(client, f"{GITHUB_API}/repos/{owner}/{repo}/readme", headers={**auth_headers, **RAW_ACCEPT}),
+        cached_get(client, f"{GITHUB_API}/repos/{owner}/{repo}/languages", headers=auth_headers),
+        cached_get(
+            client,
+            f"{GITHUB_API}/repos/{owner}/{repo}/commits",
+            params={"per_page": 20},  # only the latest 20 are used
+            headers=auth_headers,
+        ),
+        return_exceptions=True,
+    )
 
+    readme_text = ""
+    try:
+        if not isinstance(readme_resp, Exception) and readme_resp.is_success:
+            readme_text = readme_resp.text
+    except Exception:
+        readme_text = ""
+
+    languages = {}
+    try:
+        if not isinstance(langs_resp, Exception) and langs_resp.is_success:
+            languages = langs_resp.json()
+    except Exception:
         languages = {}
-        try:
-            langs_resp = await client.get(f"{GITHUB_API}/repos/{owner}/{repo}/languages")
-            if langs_resp.is_success:
-                languages = langs_resp.json()
-        except Exception:
-            languages = {}
 
+    commits = []
+    try:
+        if not isinstance(commits_resp, Exception) and commits_resp.is_success:
+            commits_json = commits_resp.json()
+            if isinstance(commits_json, list):
+                commits = commits_json
+    except Exception:
         commits = []
-        try:
-            commits_resp = await client.get(f"{GITHUB_API}/repos/{owner}/{repo}/commits")
-            if commits_resp.is_success:
-                commits_json = commits_resp.json()
-                if isinstance(commits_json, list):
-                    commits = commits_json
-        except Exception:
-            commits = []
-
-    # extract README text if base64 encoded
-    readme_text = ""
-    if "content" in readme_data:
-        import base64
-        readme_text = base64.b64decode(readme_data["content"]).decode("utf-8", errors="ignore")
 
     return {
         "repo": repo_data,
@@ -122,6 +166,198 @@ async def fetch_github_repo(repo_url: str):
 
 
 # -------------------- GitHub Profile fetch (for Authenticity Agent) --------------------
+GITHUB_GRAPHQL = f"{GITHUB_API}/graphql"
+
+# One round trip for everything the REST path needs ~100+ calls for.
+# contributionsCollection defaults to the last year.
+# Both collectors share one definition of the scored signals: README size in bytes for the
+# first PROFILE_README_REPOS non-fork repos, and each repo's PROFILE_REPO_LANGUAGES largest
+# languages. Known remaining difference: GraphQL only sees a README.md at HEAD, while REST
+# /readme also finds README.rst / lowercase names.
+PROFILE_README_REPOS = 10
+PROFILE_REPO_LANGUAGES = 10
+PROFILE_GRAPHQL_QUERY = """
+query($login: String!, $languages: Int!) {
+  user(login: $login) {
+    name
+    bio
+    createdAt
+    followers { totalCount }
+    following { totalCount }
+    publicRepos: repositories(privacy: PUBLIC) { totalCount }
+    contributionsCollection { totalCommitContributions }
+    repositories(first: 100, privacy: PUBLIC, ownerAffiliations: OWNER, isFork: false,
+                 orderBy: {field: UPDATED_AT, direction: DESC}) {
+      nodes {
+        name
+        description
+        stargazerCount
+        primaryLanguage { name }
+        languages(first: $languages, orderBy: {field: SIZE, direction: DESC}) {
+          edges { size node { name } }
+        }
+        readme: object(expression: "HEAD:README.md") { ... on Blob { byteSize } }
+      }
+    }
+  }
+}
+"""
+
+
+async def _collect_profile_graphql(client: httpx.AsyncClient, username: str, auth_headers: Dict[str, str]):
+    """Collect raw profile signals with a single GraphQL call.
+
+    Returns None when GraphQL is unavailable (e.g. no token, transport error) so the
+    caller can fall back to REST. Raises HTTPException for an unknown user.
+    """
+    try:
+        resp = await client.post(
+            GITHUB_GRAPHQL,
+            json={
+                "query": PROFILE_GRAPHQL_QUERY,
+                "variables": {"login": username, "languages": PROFILE_REPO_LANGUAGES},
+            },
+            headers=auth_headers,
+        )
+        if not resp.is_success:
+            return None
+        payload = resp.json()
+    except Exception:
+        return None
+
+    user = (payload.get("data") or {}).get("user")
+    if user is None:
+        if any(err.get("type") == "NOT_FOUND" for err in payload.get("errors") or []):
+            raise HTTPException(status_code=404, detail=f"GitHub user '{username}' not found")
+        return None
+
+    repos = []
+    language_counts = Counter()
+    readme_lengths = []
+    for i, node in enumerate((user.get("repositories") or {}).get("nodes") or []):
+        repos.append({
+            "name": node.get("name", ""),
+            "language": (node.get("primaryLanguage") or {}).get("name"),
+            "stargazers_count": node.get("stargazerCount", 0),
+            "description": node.get("description"),
+        })
+        language_counts.update({
+            edge["node"]["name"]: edge.get("size", 0)
+            for edge in (node.get("languages") or {}).get("edges") or []
+        })
+        if i < PROFILE_README_REPOS and node.get("readme"):  # Check top 10 repos
+            readme_lengths.append(node["readme"].get("byteSize", 0))
+
+    user_data = {
+        "public_repos": (user.get("publicRepos") or {}).get("totalCount", 0),
+        "name": user.get("name"),
+        "bio": user.get("bio"),
+        "followers": (user.get("followers") or {}).get("totalCount"),
+        "following": (user.get("following") or {}).get("totalCount"),
+        "created_at": user.get("createdAt"),
+    }
+    commit_count_last_year = (user.get("contributionsCollection") or {}).get("totalCommitContributions", 0)
+    return user_data, repos, language_counts, commit_count_last_year, readme_lengths
+
+
+async def _collect_profile_rest(client: httpx.AsyncClient, username: str, auth_headers: Dict[str, str]):
+    """Collect raw profile signals through the REST API (works without a token)."""
+    # 1. Get user profile
+    try:
+        user_resp = await cached_get(client, f"{GITHUB_API}/users/{username}", headers=auth_headers)
+        user_resp.raise_for_status()
+        user_data = user_resp.json()
+    except httpx.HTTPStatusError as exc:
+        status = exc.response.status_code if exc.response else 500
+        if status == 403:
+            detail = "GitHub API returned 403 (rate limit). Set GITHUB_TOKEN/GITHUB_PAT for authenticated requests."
+        elif status == 404:
+            detail = f"GitHub user '{username}' not found"
+        else:
+            detail = f"GitHub API returned {status} for user {username}"
+        raise HTTPException(status_code=status, detail=detail)
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"GitHub API request failed: {exc}")
+    
+    # 2. Get user's repos (limited to first 100 for performance)
+    repos = []
+    try:
+        repos_resp = await cached_get(
+            client,
+            f"{GITHUB_API}/users/{username}/repos",
+            params={"sort": "updated", "per_page": 100},
+            headers=auth_headers,
+        )
+        if repos_resp.is_success:
+            repos = repos_resp.json()
+    except Exception:
+        repos = []
+    
+    # 3. Languages for every non-fork repo and READMEs for the top 10, as one concurrent batch
+    own_repos = [repo for repo in repos if not repo.get("fork")]  # Skip forks
+    lang_requests = [
+        (f"{GITHUB_API}/repos/{username}/{repo['name']}/languages", auth_headers)
+        for repo in own_repos
+    ]
+    readme_headers = {**auth_headers, **RAW_ACCEPT}
+    readme_requests = [
+        (f"{GITHUB_API}/repos/{username}/{repo['name']}/readme", readme_headers)
+        for repo in own_repos[:PROFILE_README_REPOS]  # Check top 10 repos
+    ]
+    responses = await _gather_limited(client, lang_requests + readme_requests)
+    lang_responses = responses[:len(lang_requests)]
+    readme_responses = responses[len(lang_requests):]
+
+    language_counts = Counter()
+    for lang_resp in lang_responses:
+        if isinstance(lang_resp, Exception) or not lang_resp.is_success:
+            continue
+        try:
+            # Same per-repo cap as the GraphQL languages(first: ...) connection
+            language_counts.update(dict(Counter(lang_resp.json()).most_common(PROFILE_REPO_LANGUAGES)))
+        except Exception:
+            continue
+
+    readme_lengths = []
+    for readme_resp in readme_responses:
+        if isinstance(readme_resp, Exception) or not readme_resp.is_success:
+            continue
+        try:
+            # Bytes, matching the GraphQL Blob.byteSize
+            readme_lengths.append(len(readme_resp.content))
+        except Exception:
+            continue
+    
+    # 4. Estimate commit frequency (from user events API)
+    commit_count_last_year = 0
+    try:
+        events_resp = await cached_get(
+            client,
+            f"{GITHUB_API}/users/{username}/events/public",
+            params={"per_page": 100},
+            headers=auth_headers,
+        )
+        if events_resp.is_success:
+            events = events_resp.json()
+            # Count PushEvents in last year (timestamps are UTC, so compare tz-aware)
+            one_year_ago = datetime.now(timezone.utc) - timedelta(days=365)
+            for event in events:
+                if event.get("type") == "PushEvent":
+                    created_at = event.get("created_at", "")
+                    try:
+                        event_date = _parse_iso(created_at)
+                        if event_date > one_year_ago:
+                            # Each PushEvent can contain multiple commits
+                            commits = event.get("payload", {}).get("commits", [])
+                            commit_count_last_year += len(commits) if commits else 1
+                    except:
+                        continue
+    except Exception:
+        pass
+    
+    return user_data, repos, language_counts, commit_count_last_year, readme_lengths
+
+
 async def fetch_github_profile(username: str) -> Dict[str, Any]:
     """
     Fetch aggregated GitHub profile data for authenticity analysis.
@@ -132,175 +368,93 @@ async def fetch_github_profile(username: str) -> Dict[str, Any]:
     - readme_quality: average quality assessment
     - contribution_pattern: based on commit distribution
     - top_projects: sorted by stars
+
+    Uses a single GraphQL query when a token is configured (GraphQL requires auth),
+    otherwise falls back to the REST endpoints.
     """
     if not username or not username.strip():
         raise HTTPException(status_code=400, detail="Provide a GitHub username")
     
     username = username.strip().lstrip("@")
-    github_token = os.getenv("GITHUB_TOKEN") or os.getenv("GITHUB_PAT")
-    base_headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "fastapi/1.0",
-    }
-    if github_token:
-        base_headers["Authorization"] = f"Bearer {github_token}"
+    auth_headers = _auth_headers()
     
-    async with httpx.AsyncClient(timeout=30, headers=base_headers) as client:
-        # 1. Get user profile
-        try:
-            user_resp = await client.get(f"{GITHUB_API}/users/{username}")
-            user_resp.raise_for_status()
-            user_data = user_resp.json()
-        except httpx.HTTPStatusError as exc:
-            status = exc.response.status_code if exc.response else 500
-            if status == 403:
-                detail = "GitHub API returned 403 (rate limit). Set GITHUB_TOKEN/GITHUB_PAT for authenticated requests."
-            elif status == 404:
-                detail = f"GitHub user '{username}' not found"
-            else:
-                detail = f"GitHub API returned {status} for user {username}"
-            raise HTTPException(status_code=status, detail=detail)
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=502, detail=f"GitHub API request failed: {exc}")
-        
-        repo_count = user_data.get("public_repos", 0)
-        
-        # 2. Get user's repos (limited to first 100 for performance)
-        repos = []
-        try:
-            repos_resp = await client.get(
-                f"{GITHUB_API}/users/{username}/repos",
-                params={"sort": "updated", "per_page": 100}
-            )
-            if repos_resp.is_success:
-                repos = repos_resp.json()
-        except Exception:
-            repos = []
-        
-        # 3. Aggregate languages across all repos
-        language_counts = {}
-        for repo in repos:
-            if repo.get("fork"):  # Skip forks
-                continue
-            try:
-                lang_resp = await client.get(f"{GITHUB_API}/repos/{username}/{repo['name']}/languages")
-                if lang_resp.is_success:
-                    langs = lang_resp.json()
-                    for lang, bytes_count in langs.items():
-                        language_counts[lang] = language_counts.get(lang, 0) + bytes_count
-            except Exception:
-                continue
-        
-        # Sort languages by usage
-        sorted_langs = sorted(language_counts.items(), key=lambda x: x[1], reverse=True)
-        languages = [lang for lang, _ in sorted_langs[:10]]  # Top 10 languages
-        
-        # 4. Estimate commit frequency (from user events API)
-        commit_count_last_year = 0
-        try:
-            events_resp = await client.get(
-                f"{GITHUB_API}/users/{username}/events/public",
-                params={"per_page": 100}
-            )
-            if events_resp.is_success:
-                events = events_resp.json()
-                # Count PushEvents in last year
-                from datetime import datetime, timedelta
-                one_year_ago = datetime.now() - timedelta(days=365)
-                for event in events:
-                    if event.get("type") == "PushEvent":
-                        created_at = event.get("created_at", "")
-                        try:
-                            event_date = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                            if event_date > one_year_ago:
-                                # Each PushEvent can contain multiple commits
-                                commits = event.get("payload", {}).get("commits", [])
-                                commit_count_last_year += len(commits) if commits else 1
-                        except:
-                            continue
-        except Exception:
-            pass
-        
-        # Categorize commit frequency
-        if commit_count_last_year >= 500:
-            commit_frequency = f"Very Active - {commit_count_last_year}+ commits in last year"
-        elif commit_count_last_year >= 200:
-            commit_frequency = f"Active - {commit_count_last_year} commits in last year"
-        elif commit_count_last_year >= 100:
-            commit_frequency = f"Moderate - {commit_count_last_year} commits in last year"
-        elif commit_count_last_year > 0:
-            commit_frequency = f"Low - {commit_count_last_year} commits in last year"
-        else:
-            commit_frequency = "None"
-        
-        # 5. Assess README quality (sample top repos)
-        readme_scores = []
-        for repo in repos[:10]:  # Check top 10 repos
-            if repo.get("fork"):
-                continue
-            try:
-                readme_resp = await client.get(
-                    f"{GITHUB_API}/repos/{username}/{repo['name']}/readme"
-                )
-                if readme_resp.is_success:
-                    readme_data = readme_resp.json()
-                    content = readme_data.get("content", "")
-                    import base64
-                    readme_text = base64.b64decode(content).decode("utf-8", errors="ignore")
-                    
-                    # Simple quality heuristic
-                    length = len(readme_text)
-                    if length > 2000:
-                        readme_scores.append(4)  # Excellent
-                    elif length > 1000:
-                        readme_scores.append(3)  # Good
-                    elif length > 300:
-                        readme_scores.append(2)  # Fair
-                    else:
-                        readme_scores.append(1)  # Poor
-            except Exception:
-                continue
-        
-        # Average README quality
-        if readme_scores:
-            avg_score = sum(readme_scores) / len(readme_scores)
-            if avg_score >= 3.5:
-                readme_quality = "Excellent - detailed documentation"
-            elif avg_score >= 2.5:
-                readme_quality = "Good - basic documentation"
-            elif avg_score >= 1.5:
-                readme_quality = "Fair - minimal documentation"
-            else:
-                readme_quality = "Poor - minimal documentation"
+    client = get_client()
+    collected = None
+    if auth_headers:
+        collected = await _collect_profile_graphql(client, username, auth_headers)
+    if collected is None:
+        collected = await _collect_profile_rest(client, username, auth_headers)
+    user_data, repos, language_counts, commit_count_last_year, readme_lengths = collected
+
+    repo_count = user_data.get("public_repos", 0)
+    
+    # Top 10 languages by usage (most_common(n) is heapq.nlargest under the hood)
+    languages = [lang for lang, _ in language_counts.most_common(10)]
+    
+    # Categorize commit frequency
+    if commit_count_last_year >= 500:
+        commit_frequency = f"Very Active - {commit_count_last_year}+ commits in last year"
+    elif commit_count_last_year >= 200:
+        commit_frequency = f"Active - {commit_count_last_year} commits in last year"
+    elif commit_count_last_year >= 100:
+        commit_frequency = f"Moderate - {commit_count_last_year} commits in last year"
+    elif commit_count_last_year > 0:
+        commit_frequency = f"Low - {commit_count_last_year} commits in last year"
+    else:
+        commit_frequency = "None"
+    
+    # Assess README quality (simple length heuristic)
+    readme_scores = []
+    for length in readme_lengths:
+        if length > 2000:
+            readme_scores.append(4)  # Excellent
+        elif length > 1000:
+            readme_scores.append(3)  # Good
+        elif length > 300:
+            readme_scores.append(2)  # Fair
         else:
-            readme_quality = "N/A"
-        
-        # 6. Contribution pattern (based on commit distribution)
-        if commit_count_last_year >= 250:
-            contribution_pattern = "Consistent - daily commits"
-        elif commit_count_last_year >= 100:
-            contribution_pattern = "Periodic - weekly commits"
-        elif commit_count_last_year >= 50:
-            contribution_pattern = "Growing - increasing activity"
-        elif commit_count_last_year > 0:
-            contribution_pattern = "Sporadic - monthly commits"
+            readme_scores.append(1)  # Poor
+    
+    # Average README quality
+    if readme_scores:
+        avg_score = sum(readme_scores) / len(readme_scores)
+        if avg_score >= 3.5:
+            readme_quality = "Excellent - detailed documentation"
+        elif avg_score >= 2.5:
+            readme_quality = "Good - basic documentation"
+        elif avg_score >= 1.5:
+            readme_quality = "Fair - minimal documentation"
         else:
-            contribution_pattern = "No public activity"
-        
-        # 7. Top projects (sorted by stars)
-        top_projects = []
-        sorted_repos = sorted(
-            [r for r in repos if not r.get("fork")],
-            key=lambda x: x.get("stargazers_count", 0),
-            reverse=True
-        )
-        for repo in sorted_repos[:5]:  # Top 5 projects
-            top_projects.append({
-                "name": repo.get("name", ""),
-                "language": repo.get("language", "Unknown"),
-                "stars": repo.get("stargazers_count", 0),
-                "description": repo.get("description", "") or "No description"
-            })
+            readme_quality = "Poor - minimal documentation"
+    else:
+        readme_quality = "N/A"
+    
+    # 6. Contribution pattern (based on commit distribution)
+    if commit_count_last_year >= 250:
+        contribution_pattern = "Consistent - daily commits"
+    elif commit_count_last_year >= 100:
+        contribution_pattern = "Periodic - weekly commits"
+    elif commit_count_last_year >= 50:
+        contribution_pattern = "Growing - increasing activity"
+    elif commit_count_last_year > 0:
+        contribution_pattern = "Sporadic - monthly commits"
+    else:
+        contribution_pattern = "No public activity"
+    
+    # 7. Top 5 projects by stars (partial selection, no full sort)
+    top_projects = []
+    sorted_repos = heapq.nlargest(
+        5,
+        (r for r in repos if not r.get("fork")),
+        key=lambda x: x.get("stargazers_count", 0),
+    )
+    for repo in sorted_repos:
+        top_projects.append({
+            "name": repo.get("name", ""),
+            "language": repo.get("language", "Unknown"),
+            "stars": repo.get("stargazers_count", 0),
+            "description": repo.get("description", "") or "No description"
+        })
     
     return {
         "username": username,
@@ -321,10 +475,14 @@ async def fetch_github_profile(username: str) -> Dict[str, Any]:
 
 
 # -------------------- RAG retrieval --------------------
-def get_rag_context(query: str, collection_name="github_knowledge"):
-    col = seed_github_collection(collection_name)
-    q_emb = embed([query])[0]
-    res = col.query(query_embeddings=[q_emb], n_results=3)
+async def get_rag_context(query: str, collection_name="github_knowledge"):
+    # Chroma calls are synchronous; run them in the default threadpool so the event loop stays free
+    loop = asyncio.get_running_loop()
+    col = await loop.run_in_executor(None, seed_github_collection, collection_name)
+    q_emb = await embed_async(query)
+    res = await loop.run_in_executor(
+        None, lambda: col.query(query_embeddings=[q_emb], n_results=3)
+    )
 
     docs = res.get("documents", [[]])[0] if res else []
     ids = res.get("ids", [[]])[0] if res else []
@@ -347,7 +505,7 @@ async def analyze_github_repo(repo_url: str):
     commits = repo_data["commits"]
 
     # 2. Prepare RAG
-    rag_docs, rag_context = get_rag_context(repo_url)
+    rag_docs, rag_context = await get_rag_context(repo_url)
 
     # Build tech stack summary
     tech_stack_list = list(languages.keys()) if languages else []
@@ -359,13 +517,13 @@ async def analyze_github_repo(repo_url: str):
 Repository URL: {repo_url}
 
 Tech Stack (from GitHub API):
-{json.dumps(tech_stack_list, indent=2)}
+{orjson.dumps(tech_stack_list, option=orjson.OPT_INDENT_2).decode()}
 
 README excerpt:
 {readme[:3000] if readme else "No README available"}
 
 Recent commit messages:
-{json.dumps(commit_messages, indent=2)}
+{orjson.dumps(commit_messages, option=orjson.OPT_INDENT_2).decode()}
 
 Best Practices (RAG Knowledge):
 {rag_context}
@@ -399,16 +557,22 @@ CRITICAL: Return ONLY the JSON object. No markdown, no code fences, no extra tex
     # Clean markdown fences if present
     cleaned = raw.strip()
     if cleaned.startswith("```"):
-        lines = cleaned.split("\n")
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        cleaned = "\n".join(lines).strip()
+        cleaned = _FENCE_RE.sub("", cleaned).strip()
+
+    # Drop any prose around the JSON object so it parses locally instead of needing an LLM fix
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start != -1 and end > start:
+        cleaned = cleaned[start:end + 1]
 
     # JSON parse with retry
     try:
-        parsed = json.loads(cleaned)
-    except json.JSONDecodeError:
-        # Try to fix with LLM
-        fix_prompt = f"""Convert this to valid JSON matching the schema:
+        parsed = orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        parsed = None
+        # Only worth an LLM repair round-trip if the output looks like our (broken) JSON;
+        # pure prose goes straight to the fallback structure
+        if "{" in cleaned and '"tech_stack"' in cleaned:
+            fix_prompt = f"""Convert this to valid JSON matching the schema:
 {{
   "tech_stack": [],
   "metrics": [{{"name": "", "score": 0, "explanation": ""}}],
@@ -422,15 +586,16 @@ Input to fix:
 {cleaned}
 
 Return ONLY valid JSON, no markdown fences."""
-        try:
-            fix = await call_chat(fix_prompt, temperature=0.1, max_tokens=1500)
-            fix = fix.strip()
-            if fix.startswith("```"):
-                lines = fix.split("\n")
-                lines = [l for l in lines if not l.strip().startswith("```")]
-                fix = "\n".join(lines).strip()
-            parsed = json.loads(fix)
-        except:
+            try:
+                fix = await call_chat(fix_prompt, temperature=0.1, max_tokens=1500)
+                fix = fix.strip()
+                if fix.startswith("```"):
+                    fix = _FENCE_RE.sub("", fix).strip()
+                parsed = orjson.loads(fix)
+            except Exception:
+                parsed = None
+
+        if parsed is None:
             # Fallback to minimal valid structure
             parsed = {
                 "tech_stack": tech_stack_list,
@@ -466,18 +631,21 @@ Return ONLY valid JSON, no markdown fences."""
         else:
             parsed["tech_stack"] = ["Unknown"]
 
+    # Index metrics by name (first occurrence wins, dropping duplicate metrics from the LLM)
+    metrics_by_name = {}
+    for m in parsed.get("metrics") or []:
+        metrics_by_name.setdefault(str(m.get("name", "")).lower(), m)
+
     # Add heuristic Complexity metric if missing
-    metrics = parsed.get("metrics") or []
-    has_complexity = any((m.get("name", "").lower() == "complexity") for m in metrics)
-    if not has_complexity:
+    if "complexity" not in metrics_by_name:
         size_kb = (repo_data.get("repo") or {}).get("size") or 0
         complexity_score = max(10, min(100, int(size_kb / 50)))
-        metrics.append({
+        metrics_by_name["complexity"] = {
             "name": "Complexity",
             "score": complexity_score,
             "explanation": "Heuristic from GitHub reported repo size (KB)."
-        })
-        parsed["metrics"] = metrics
+        }
+    parsed["metrics"] = list(metrics_by_name.values())
 
     # Convert parsed dict into an object with attribute access for tests
     try:
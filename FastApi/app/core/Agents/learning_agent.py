@@ -1,51 +1,86 @@
-import json
+import asyncio
+import copy
+import functools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import orjson
 from app.core.Utils.llm_client import call_chat
-from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
-from app.core.RAGANDEMBEDDINGS.embeddings import embed
-from app.core.RAGANDEMBEDDINGS.learning_rag_data import learning_knowledge
-from app.core.Utils.llm_client import _call_gemini
+from app.core.RAGANDEMBEDDINGS.embeddings import embed_one
+from app.core.RAGANDEMBEDDINGS.flat_index import build_flat_index, topk_ip
+from app.core.RAGANDEMBEDDINGS.learning_rag_data import (
+    LEARNING_IDS,
+    LEARNING_TEXTS,
+    learning_knowledge,
+)
+from app.core.Utils.llm_client import LLMUnavailableError, _call_gemini, _call_gemini_stream
+
+LEARNING_TOP_K = 3
+
+# Prompt/decode budget: the JSON plan fits comfortably in 2800 output tokens, and the RAG
+# guidance is capped so retrieval hits cannot inflate the prompt.
+LEARNING_MAX_TOKENS = 2800
+RAG_CONTEXT_MAX_CHARS = 1500
+
+# Whole markdown fence lines (``` / ```json), removed in one regex pass
+_FENCE_RE = re.compile(r"^[ \t]*```[^\n]*\n?", re.MULTILINE)
+
+# LEARNING_INDEX_INT8=1 stores the seed matrix as int8 rows plus one float32 scale per row
+# (4x smaller resident footprint); scores are rescaled back to float32 before ranking.
+LEARNING_INDEX_INT8 = os.getenv("LEARNING_INDEX_INT8", "0") == "1"
+
+# (matrix, scales, ids, texts): the corpus is small and static, so retrieval is a flat
+# inner-product scan over L2-normalized rows instead of a Chroma/HNSW round trip.
+# scales is None unless the matrix is int8-quantized.
+_LEARNING_INDEX = None
+_LEARNING_INDEX_LOCK = threading.Lock()
+
+# id -> first 300 chars of the doc, precomputed for the evidence_snippets field
+EVIDENCE_SNIPPET_CHARS = 300
+_SNIPPETS = {}
 
 def seed_learning_collection():
-    """Seed learning knowledge into vector database for RAG."""
-    col = get_or_create_collection("learning_knowledge")
-    if col.count() == 0:
-        texts = [x["text"] for x in learning_knowledge]
-        ids = [x["id"] for x in learning_knowledge]
-        emb = embed(texts)
-        col.add(documents=texts, ids=ids, embeddings=emb)
-    return col
+    """Build the in-memory learning knowledge index for RAG.
 
-def get_learning_rag_context(query: str):
-    """Retrieve relevant learning guidance from RAG."""
-    col = seed_learning_collection()
-    q_emb = embed([query])[0]
-    res = col.query(query_embeddings=[q_emb], n_results=3)
+    Built once per process; later calls return the cached (matrix, scales, ids, texts) index.
+    """
+    global _LEARNING_INDEX
+    if _LEARNING_INDEX is not None:
+        return _LEARNING_INDEX
+    with _LEARNING_INDEX_LOCK:
+        if _LEARNING_INDEX is None:
+            matrix, scales, ids, texts = build_flat_index(
+                "learning_knowledge",
+                learning_knowledge,
+                int8=LEARNING_INDEX_INT8,
+                ids=LEARNING_IDS,
+                texts=LEARNING_TEXTS,
+            )
+            _SNIPPETS.update((i, t[:EVIDENCE_SNIPPET_CHARS]) for i, t in zip(ids, texts))
+            _LEARNING_INDEX = (matrix, scales, ids, texts)
+    return _LEARNING_INDEX
 
-    docs = res["documents"][0]
-    ids = res["ids"][0]
+@functools.lru_cache(maxsize=512)
+def _cached_learning_rag(query_norm: str):
+    """Embed + top-3 lookup for a normalized query; docs returned as hashable (id, text) pairs."""
+    matrix, scales, all_ids, all_texts = seed_learning_collection()
+    top = topk_ip(matrix, embed_one(query_norm), LEARNING_TOP_K, scales)
 
-    context = "\n\n".join([f"ID:{ids[i]}\n{docs[i]}" for i in range(len(docs))])
-    rag_docs = [{"id": ids[i], "text": docs[i]} for i in range(len(docs))]
+    pairs = tuple((all_ids[i], all_texts[i]) for i in top.tolist())
+    context = "\n\n".join(f"ID:{doc_id}\n{text}" for doc_id, text in pairs)
+    return context, pairs
+
+def get_learning_rag_context(query: str):
+    """Retrieve relevant learning guidance from RAG (cached per normalized query)."""
+    context, pairs = _cached_learning_rag(query.strip().lower())
+    rag_docs = [{"id": doc_id, "text": text} for doc_id, text in pairs]
 
     return context, rag_docs
 
-async def generate_learning_flow(topic: str, experience_level: str = "beginner", weekly_hours: str = "5-10"):
-    """Generate learning flow matching frontend expectations with RAG enhancement."""
-    
-    # Calculate timeline based on weekly hours
-    hours_map = {"1-5": 3, "5-10": 7, "10-20": 15, "20+": 25}
-    avg_hours = hours_map.get(weekly_hours, 7)
-    
-    # Estimate total weeks (adjust based on experience level)
-    level_multiplier = {"beginner": 1.5, "intermediate": 1.0, "advanced": 0.7}
-    multiplier = level_multiplier.get(experience_level, 1.0)
-    estimated_weeks = int(12 * multiplier)
-    
-    # Get RAG context for curriculum design best practices
-    query = f"{topic} {experience_level} learning path curriculum"
-    rag_context, rag_docs = get_learning_rag_context(query)
-    
-    prompt = f"""You are an expert curriculum designer. Create a COMPLETE, DETAILED learning roadmap for: "{topic}"
+# Built once at import; only the per-request slots are filled via str.format_map
+_PROMPT_TEMPLATE = """You are an expert curriculum designer. Create a COMPLETE, DETAILED learning roadmap for: "{topic}"
 
 Experience Level: {experience_level}
 Weekly Study Hours: {weekly_hours}
@@ -133,12 +168,12 @@ Required JSON structure:
       "estimatedHours": 60
     }}
   ],
-  "timeline": "Complete in {estimated_weeks} weeks with {weekly_hours} hours per week for a total of approximately {int(estimated_weeks * 7.5)} hours",
+  "timeline": "Complete in {estimated_weeks} weeks with {weekly_hours} hours per week for a total of approximately {total_hours} hours",
   "prerequisites": ["Basic computer literacy", "Text editor installed", "Internet connection", "Dedication and consistency"],
   "resources": {{
     "books": ["Official {topic} Documentation", "Eloquent JavaScript (if web)", "Clean Code by Robert Martin", "{topic} Cookbook"],
     "websites": ["Official Documentation", "MDN Web Docs", "Stack Overflow", "Dev.to", "Medium tutorials"],
-    "communities": ["r/{topic.lower().replace(' ', '')} on Reddit", "{topic} Discord Server", "Stack Overflow", "Dev.to Community", "GitHub Discussions"]
+    "communities": ["r/{topic_lower} on Reddit", "{topic} Discord Server", "Stack Overflow", "Dev.to Community", "GitHub Discussions"]
   }}
 }}
 
@@ -156,118 +191,252 @@ CRITICAL RULES:
 
 Generate the COMPLETE JSON now:"""
 
+# Fallback plan used when the LLM output cannot be parsed. Built once; each failure deep-copies
+# it and fills the __PLACEHOLDER__ slots in string leaves (see _fill_fallback).
+_FALLBACK_TEMPLATE = {
+    "phases": [
+        {
+            "name": "Phase 1: Fundamentals",
+            "duration": "__PHASE_WEEKS__ weeks",
+            "description": "Learn the core concepts of __TOPIC__",
+            "keyTopics": ["Basics", "Core Concepts", "Syntax", "Variables", "Basic Operations"]
+        },
+        {
+            "name": "Phase 2: Intermediate Skills",
+            "duration": "__PHASE_WEEKS__ weeks",
+            "description": "Build practical projects with __TOPIC__",
+            "keyTopics": ["Advanced Features", "Best Practices", "Real Projects", "Testing", "Debugging"]
+        },
+        {
+            "name": "Phase 3: Mastery",
+            "duration": "__LAST_PHASE_WEEKS__ weeks",
+            "description": "Become proficient in __TOPIC__",
+            "keyTopics": ["Advanced Patterns", "Optimization", "Production Ready", "Security", "Deployment"]
+        }
+    ],
+    "mermaidDiagram": "graph TD\n  A[Start Learning __TOPIC__] --> B[Phase 1: Fundamentals]\n  B --> C[Phase 2: Intermediate]\n  C --> D[Phase 3: Mastery]\n  D --> E[Complete]",
+    "youtubeChannels": [
+        {
+            "name": "freeCodeCamp",
+            "url": "https://youtube.com/@freecodecamp",
+            "focus": "Comprehensive tutorials and full courses",
+            "recommendedPlaylists": ["__TOPIC__ Full Course", "Beginner Tutorial"]
+        },
+        {
+            "name": "Traversy Media",
+            "url": "https://youtube.com/@TraversyMedia",
+            "focus": "Practical web development tutorials",
+            "recommendedPlaylists": ["__TOPIC__ Crash Course", "Project Builds"]
+        },
+        {
+            "name": "Net Ninja",
+            "url": "https://youtube.com/@NetNinja",
+            "focus": "Step-by-step coding tutorials",
+            "recommendedPlaylists": ["__TOPIC__ Tutorial Series"]
+        }
+    ],
+    "projects": [
+        {
+            "name": "Simple __TOPIC__ Application",
+            "description": "Build a basic application to understand fundamentals",
+            "difficulty": "beginner",
+            "estimatedHours": 10
+        },
+        {
+            "name": "Intermediate __TOPIC__ Project",
+            "description": "Create a real-world application with multiple features",
+            "difficulty": "intermediate",
+            "estimatedHours": 25
+        },
+        {
+            "name": "Advanced __TOPIC__ System",
+            "description": "Build a production-ready application",
+            "difficulty": "advanced",
+            "estimatedHours": 50
+        }
+    ],
+    "timeline": "Complete in __WEEKS__ weeks with __HOURS__ hours per week",
+    "prerequisites": ["Basic computer skills", "Internet access", "Dedication to learn"],
+    "resources": {
+        "books": ["Official __TOPIC__ Documentation", "__TOPIC__ Best Practices Guide"],
+        "websites": ["Official Documentation", "MDN Web Docs", "Stack Overflow"],
+        "communities": ["Reddit community", "Discord servers", "GitHub Discussions"]
+    }
+}
+
+def _fill_fallback(node, replacements):
+    """Recursively substitute __PLACEHOLDER__ tokens in the string leaves of a deep-copied template."""
+    if isinstance(node, str):
+        for token, value in replacements.items():
+            node = node.replace(token, value)
+        return node
+    if isinstance(node, list):
+        return [_fill_fallback(item, replacements) for item in node]
+    if isinstance(node, dict):
+        return {key: _fill_fallback(value, replacements) for key, value in node.items()}
+    return node
+
+# Top-up defaults for the post-parse augmentation; "{topic}" is filled per request
+_DEFAULT_PHASE = {
+    "name": "Phase 1: Foundations",
+    "duration": "4 weeks",
+    "description": "Learn the core concepts of {topic}",
+    "keyTopics": ["Basics", "Core Concepts", "Fundamentals", "Tools", "Getting Started"]
+}
+_DEFAULT_KEY_TOPIC_PADDING = (
+    "{topic} fundamentals",
+    "Practical exercises",
+    "Testing & debugging",
+    "Documentation & best practices",
+    "Project work"
+)
+_DEFAULT_PROJECTS = (
+    {"name": "Simple {topic} App", "description": "Build a simple app to learn core {topic} concepts", "difficulty": "beginner", "estimatedHours": 8},
+    {"name": "Intermediate {topic} Project", "description": "Build a medium complexity project using {topic}", "difficulty": "intermediate", "estimatedHours": 20},
+    {"name": "Advanced {topic} System", "description": "Build a production-like system for {topic}", "difficulty": "advanced", "estimatedHours": 50},
+    {"name": "Portfolio {topic} Project", "description": "Create a portfolio-ready {topic} project", "difficulty": "intermediate", "estimatedHours": 25}
+)
+_DEFAULT_YTS = (
+    {"name": "freeCodeCamp", "url": "https://youtube.com/@freecodecamp", "focus": "Comprehensive full-length courses and tutorials"},
+    {"name": "Traversy Media", "url": "https://youtube.com/@TraversyMedia", "focus": "Practical crash courses and project builds"},
+    {"name": "The Net Ninja", "url": "https://youtube.com/@NetNinja", "focus": "Step-by-step tutorial series"}
+)
+
+# Top-level keys the frontend requires, with factories for their empty values
+_REQUIRED_FIELD_FACTORIES = (
+    ("phases", list),
+    ("youtubeChannels", list),
+    ("projects", list),
+    ("prerequisites", list),
+    ("resources", lambda: {"books": [], "websites": [], "communities": []}),
+)
+
+def _with_topic(template, topic):
+    """Fresh copy of a default entry with "{topic}" substituted in its string values."""
+    return {
+        key: value.replace("{topic}", topic) if isinstance(value, str) else list(value) if isinstance(value, list) else value
+        for key, value in template.items()
+    }
+
+def _is_learning_plan(parsed) -> bool:
+    """True if an LLM reply looks like a plan: a non-empty phases list whose entries carry keyTopics.
+
+    Rejects the provider's mock payload, which parses as JSON but is not a plan.
+    """
+    phases = parsed.get("phases") if isinstance(parsed, dict) else None
+    return bool(phases) and isinstance(phases, list) and all(
+        isinstance(p, dict) and "keyTopics" in p for p in phases
+    )
+
+# Finished learning flows keyed by (topic, level, hours); identical requests skip the Gemini call
+FLOW_CACHE_TTL = 3600  # seconds
+FLOW_CACHE_MAXSIZE = 1024
+_flow_cache = OrderedDict()
+
+async def generate_learning_flow(topic: str, experience_level: str = "beginner", weekly_hours: str = "5-10"):
+    """Generate learning flow matching frontend expectations with RAG enhancement.
+
+    LLM-backed results are cached for FLOW_CACHE_TTL; callers always get their own deep copy.
+    """
+    # Topic is matched exactly: the plan text echoes the caller's spelling and casing
+    key = (topic, experience_level, weekly_hours)
+    hit = _flow_cache.get(key)
+    if hit is not None:
+        stored_at, cached = hit
+        if time.monotonic() - stored_at < FLOW_CACHE_TTL:
+            _flow_cache.move_to_end(key)
+            return copy.deepcopy(cached)
+        del _flow_cache[key]
+
+    parsed, from_llm = await _build_learning_flow(topic, experience_level, weekly_hours)
+    if from_llm:
+        # Fallback plans are not cached so the next request retries the LLM
+        _flow_cache[key] = (time.monotonic(), copy.deepcopy(parsed))
+        if len(_flow_cache) > FLOW_CACHE_MAXSIZE:
+            _flow_cache.popitem(last=False)
+    return parsed
+
+async def _build_learning_flow(topic: str, experience_level: str, weekly_hours: str):
+    """Run the RAG + LLM pipeline; returns (flow, from_llm)."""
+    
+    # Calculate timeline based on weekly hours
+    hours_map = {"1-5": 3, "5-10": 7, "10-20": 15, "20+": 25}
+    avg_hours = hours_map.get(weekly_hours, 7)
+    
+    # Estimate total weeks (adjust based on experience level)
+    level_multiplier = {"beginner": 1.5, "intermediate": 1.0, "advanced": 0.7}
+    multiplier = level_multiplier.get(experience_level, 1.0)
+    estimated_weeks = int(12 * multiplier)
+    
+    # Get RAG context for curriculum design best practices
+    query = f"{topic} {experience_level} learning path curriculum"
+    # embed + Chroma query are blocking; run them in a worker thread to keep the event loop free
+    rag_context, rag_docs = await asyncio.to_thread(get_learning_rag_context, query)
+    
+    prompt = _PROMPT_TEMPLATE.format_map({
+        "topic": topic,
+        "topic_lower": topic.lower().replace(" ", ""),
+        "experience_level": experience_level,
+        "weekly_hours": weekly_hours,
+        "estimated_weeks": estimated_weeks,
+        "total_hours": int(estimated_weeks * 7.5),
+        "rag_context": rag_context[:RAG_CONTEXT_MAX_CHARS],
+    })
+
     # Use Gemini for complex JSON generation (better than HF/Groq for structured output)
-    raw_response = await _call_gemini(prompt, model="gemini-2.5-flash", max_tokens=4096, temperature=0.6)
+    # Stream so chunks are collected while Gemini is still generating (and the event loop stays free)
+    chunks = []
+    try:
+        async for piece in _call_gemini_stream(prompt, model="gemini-2.5-flash", max_tokens=LEARNING_MAX_TOKENS, temperature=0.6):
+            chunks.append(piece)
+    except LLMUnavailableError:
+        # No key: the blocking client returns its mock payload without a network call
+        pass
+    except Exception as e:
+        # Text that already arrived is kept; only an empty stream is retried without streaming
+        print(f"[Learning Agent] Gemini stream failed after {len(chunks)} chunks: {e}")
+    raw_response = "".join(chunks)
+    if not raw_response.strip():
+        raw_response = await _call_gemini(prompt, model="gemini-2.5-flash", max_tokens=LEARNING_MAX_TOKENS, temperature=0.6)
     
     # Clean markdown fences
-    cleaned = raw_response.strip()
-    if cleaned.startswith("```"):
-        lines = cleaned.split("\n")
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        cleaned = "\n".join(lines).strip()
+    cleaned = _FENCE_RE.sub("", raw_response.strip()).strip()
     
-    # Parse JSON
+    # Parse JSON; only a reply with the plan structure counts as coming from the LLM
     try:
-        parsed = json.loads(cleaned)
-    except json.JSONDecodeError as e:
+        parsed = orjson.loads(cleaned)
+    except orjson.JSONDecodeError as e:
+        parsed = None
         print(f"[Learning Agent] JSON parse error: {e}")
         print(f"[Learning Agent] Raw response: {cleaned[:500]}...")
+    from_llm = _is_learning_plan(parsed)
+    if not from_llm:
+        if parsed is not None:
+            print("[Learning Agent] LLM reply has no phases/keyTopics, using fallback plan")
         
         # Fallback structure
-        parsed = {
-            "phases": [
-                {
-                    "name": "Phase 1: Fundamentals",
-                    "duration": f"{estimated_weeks // 3} weeks",
-                    "description": f"Learn the core concepts of {topic}",
-                    "keyTopics": ["Basics", "Core Concepts", "Syntax", "Variables", "Basic Operations"]
-                },
-                {
-                    "name": "Phase 2: Intermediate Skills",
-                    "duration": f"{estimated_weeks // 3} weeks",
-                    "description": f"Build practical projects with {topic}",
-                    "keyTopics": ["Advanced Features", "Best Practices", "Real Projects", "Testing", "Debugging"]
-                },
-                {
-                    "name": "Phase 3: Mastery",
-                    "duration": f"{estimated_weeks - 2 * (estimated_weeks // 3)} weeks",
-                    "description": f"Become proficient in {topic}",
-                    "keyTopics": ["Advanced Patterns", "Optimization", "Production Ready", "Security", "Deployment"]
-                }
-            ],
-            "mermaidDiagram": f"graph TD\n  A[Start Learning {topic}] --> B[Phase 1: Fundamentals]\n  B --> C[Phase 2: Intermediate]\n  C --> D[Phase 3: Mastery]\n  D --> E[Complete]",
-            "youtubeChannels": [
-                {
-                    "name": "freeCodeCamp",
-                    "url": "https://youtube.com/@freecodecamp",
-                    "focus": "Comprehensive tutorials and full courses",
-                    "recommendedPlaylists": [f"{topic} Full Course", "Beginner Tutorial"]
-                },
-                {
-                    "name": "Traversy Media",
-                    "url": "https://youtube.com/@TraversyMedia",
-                    "focus": "Practical web development tutorials",
-                    "recommendedPlaylists": [f"{topic} Crash Course", "Project Builds"]
-                },
-                {
-                    "name": "Net Ninja",
-                    "url": "https://youtube.com/@NetNinja",
-                    "focus": "Step-by-step coding tutorials",
-                    "recommendedPlaylists": [f"{topic} Tutorial Series"]
-                }
-            ],
-            "projects": [
-                {
-                    "name": f"Simple {topic} Application",
-                    "description": "Build a basic application to understand fundamentals",
-                    "difficulty": "beginner",
-                    "estimatedHours": 10
-                },
-                {
-                    "name": f"Intermediate {topic} Project",
-                    "description": "Create a real-world application with multiple features",
-                    "difficulty": "intermediate",
-                    "estimatedHours": 25
-                },
-                {
-                    "name": f"Advanced {topic} System",
-                    "description": "Build a production-ready application",
-                    "difficulty": "advanced",
-                    "estimatedHours": 50
-                }
-            ],
-            "timeline": f"Complete in {estimated_weeks} weeks with {weekly_hours} hours per week",
-            "prerequisites": ["Basic computer skills", "Internet access", "Dedication to learn"],
-            "resources": {
-                "books": [f"Official {topic} Documentation", f"{topic} Best Practices Guide"],
-                "websites": ["Official Documentation", "MDN Web Docs", "Stack Overflow"],
-                "communities": ["Reddit community", "Discord servers", "GitHub Discussions"]
-            }
-        }
+        parsed = _fill_fallback(copy.deepcopy(_FALLBACK_TEMPLATE), {
+            "__TOPIC__": topic,
+            "__WEEKS__": str(estimated_weeks),
+            "__HOURS__": str(weekly_hours),
+            "__PHASE_WEEKS__": str(estimated_weeks // 3),
+            "__LAST_PHASE_WEEKS__": str(estimated_weeks - 2 * (estimated_weeks // 3)),
+        })
     
-    # Validate required fields
-    if "phases" not in parsed:
-        parsed["phases"] = []
-    if "mermaidDiagram" not in parsed:
-        parsed["mermaidDiagram"] = f"graph TD\n  A[Start] --> B[Learn {topic}]\n  B --> C[Complete]"
-    else:
-        # Fix escaped newlines in mermaid diagrams
-        parsed["mermaidDiagram"] = parsed["mermaidDiagram"].replace("\\n", "\n")
-    if "youtubeChannels" not in parsed:
-        parsed["youtubeChannels"] = []
-    if "projects" not in parsed:
-        parsed["projects"] = []
-    if "timeline" not in parsed:
-        parsed["timeline"] = f"{estimated_weeks} weeks with {weekly_hours} hours/week"
-    if "prerequisites" not in parsed:
-        parsed["prerequisites"] = []
-    if "resources" not in parsed:
-        parsed["resources"] = {"books": [], "websites": [], "communities": []}
+    # Validate required fields (fresh containers per request; later steps mutate them)
+    for key, factory in _REQUIRED_FIELD_FACTORIES:
+        if key not in parsed:
+            parsed[key] = factory()
+    parsed.setdefault("timeline", f"{estimated_weeks} weeks with {weekly_hours} hours/week")
+    mermaid = parsed.setdefault("mermaidDiagram", f"graph TD\n  A[Start] --> B[Learn {topic}]\n  B --> C[Complete]")
+    # Fix escaped newlines in mermaid diagrams (only allocate when the LLM actually escaped them)
+    if "\\n" in mermaid:
+        parsed["mermaidDiagram"] = mermaid.replace("\\n", "\n")
     
     # Add RAG evidence for hackathon (shows RAG retrieval)
     parsed["evidence_ids"] = [d["id"] for d in rag_docs]
     parsed["evidence_snippets"] = [
-        {"id": d["id"], "snippet": d["text"][:300]} for d in rag_docs
+        {"id": d["id"], "snippet": _SNIPPETS.get(d["id"]) or d["text"][:EVIDENCE_SNIPPET_CHARS]} for d in rag_docs
     ]
     # --- Robustness: ensure minimum structural richness even if LLM output truncated ---
     try:
@@ -277,12 +446,7 @@ Generate the COMPLETE JSON now:"""
       desired_max = 6
       if len(phases) < desired_min:
         # Create additional phases by cloning and adapting the last available phase
-        last = phases[-1] if phases else {
-          "name": "Phase 1: Foundations",
-          "duration": "4 weeks",
-          "description": f"Learn the core concepts of {topic}",
-          "keyTopics": ["Basics", "Core Concepts", "Fundamentals", "Tools", "Getting Started"]
-        }
+        last = phases[-1] if phases else _with_topic(_DEFAULT_PHASE, topic)
         to_add = desired_min - len(phases)
         for i in range(to_add):
           idx = len(phases) + 1
@@ -302,44 +466,23 @@ Generate the COMPLETE JSON now:"""
         kt = p.get("keyTopics") or []
         if len(kt) < 5:
           # pad with generic topical suggestions
-          additions = [
-            f"{topic} fundamentals",
-            "Practical exercises",
-            "Testing & debugging",
-            "Documentation & best practices",
-            "Project work"
-          ]
-          needed = 5 - len(kt)
-          kt.extend(additions[:needed])
+          kt.extend(t.replace("{topic}", topic) for t in _DEFAULT_KEY_TOPIC_PADDING[:5 - len(kt)])
           p["keyTopics"] = kt
 
       # Ensure projects list has at least 4 entries
       projects = parsed.get("projects", []) or []
       if len(projects) < 4:
-        base_projects = [
-          {"name": f"Simple {topic} App", "description": f"Build a simple app to learn core {topic} concepts", "difficulty": "beginner", "estimatedHours": 8},
-          {"name": f"Intermediate {topic} Project", "description": f"Build a medium complexity project using {topic}", "difficulty": "intermediate", "estimatedHours": 20},
-          {"name": f"Advanced {topic} System", "description": f"Build a production-like system for {topic}", "difficulty": "advanced", "estimatedHours": 50},
-          {"name": f"Portfolio {topic} Project", "description": f"Create a portfolio-ready {topic} project", "difficulty": "intermediate", "estimatedHours": 25}
-        ]
         # Append missing projects
-        for pr in base_projects[len(projects):]:
-          projects.append(pr)
+        projects.extend(_with_topic(pr, topic) for pr in _DEFAULT_PROJECTS[len(projects):])
         parsed["projects"] = projects
 
       # Ensure at least 3 YouTube channels
       yts = parsed.get("youtubeChannels", []) or []
       if len(yts) < 3:
-        defaults = [
-          {"name": "freeCodeCamp", "url": "https://youtube.com/@freecodecamp", "focus": "Comprehensive full-length courses and tutorials"},
-          {"name": "Traversy Media", "url": "https://youtube.com/@TraversyMedia", "focus": "Practical crash courses and project builds"},
-          {"name": "The Net Ninja", "url": "https://youtube.com/@NetNinja", "focus": "Step-by-step tutorial series"}
-        ]
-        for ch in defaults[len(yts):]:
-          yts.append(ch)
+        yts.extend(dict(ch) for ch in _DEFAULT_YTS[len(yts):])
         parsed["youtubeChannels"] = yts
 
     except Exception as _e:
       print(f"[Learning Agent] Post-parse augmentation failed: {_e}")
     
-    return parsed
+    return parsed, from_llm
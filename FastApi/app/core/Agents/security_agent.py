@@ -1,13 +1,28 @@
-import json
+import asyncio
+import copy
+import functools
+import hashlib
 import re
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List
+import numpy as np
+import orjson
 from app.core.RAGANDEMBEDDINGS.embeddings import embed
-from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
+from app.core.RAGANDEMBEDDINGS.seed import seed_kb
 from app.core.Utils.llm_client import call_chat
 from app.core.RAGANDEMBEDDINGS.security_rag_data import security_knowledge
 import time
 
-SECURITY_LOG: List[Dict[str, Any]] = []
+# Recent RAG retrievals (bounded ring buffer; oldest entries drop off)
+SECURITY_LOG_MAXLEN = 1024
+SECURITY_LOG: Deque[Dict[str, Any]] = deque(maxlen=SECURITY_LOG_MAXLEN)
+
+# Embeddings of analysed code keyed by a blake2b digest of the text, so re-analysing the
+# same buffer skips the encoder
+CODE_EMBED_CACHE_MAXSIZE = 512
+_code_embed_cache = OrderedDict()
+_code_embed_lock = threading.Lock()
 
 # Public catalog of vulnerability patterns for API consumers (e.g., router metadata)
 # NOTE: These are descriptive; static analysis below uses its own compiled patterns.
@@ -75,26 +90,51 @@ VULNERABILITY_PATTERNS: Dict[str, Dict[str, Any]] = {
 # 1. Seed RAG
 # -------------------------------------------------------------------
 def seed_security_collection(name="security_knowledge"):
-    col = get_or_create_collection(name)
-    try:
-        if col.count() == 0:
-            texts = [x["text"] for x in security_knowledge]
-            ids = [x["id"] for x in security_knowledge]
-            emb = embed(texts)
-            col.add(documents=texts, ids=ids, embeddings=emb)
-    except:
-        texts = [x["text"] for x in security_knowledge]
-        ids = [x["id"] for x in security_knowledge]
-        emb = embed(texts)
-        col.add(documents=texts, ids=ids, embeddings=emb)
-    return col
+    return seed_kb(name, security_knowledge)
+
+
+_SEC_COL = None
+_SEC_LOCK = threading.Lock()
+
+
+def _get_security_collection():
+    """Seeded security collection, created once per process."""
+    global _SEC_COL
+    if _SEC_COL is None:
+        with _SEC_LOCK:
+            if _SEC_COL is None:
+                _SEC_COL = seed_security_collection()
+    return _SEC_COL
 
 
 # -------------------------------------------------------------------
 # 2. RAG Retrieval
 # -------------------------------------------------------------------
-def retrieve_security_docs(collection, code: str, k=3):
+def _code_digest(code: str) -> bytes:
+    # surrogatepass: lone surrogates (e.g. from JSON \ud800 escapes) must not raise here
+    return hashlib.blake2b(memoryview(code.encode("utf-8", "surrogatepass")), digest_size=16).digest()
+
+
+def _embed_code(code: str, key: bytes = None):
+    if key is None:
+        key = _code_digest(code)
+    # Called from worker threads; the lock only guards the LRU bookkeeping, not the encoder
+    with _code_embed_lock:
+        cached = _code_embed_cache.get(key)
+        if cached is not None:
+            _code_embed_cache.move_to_end(key)
+            return list(cached)
     q_emb = embed([code])[0]
+    with _code_embed_lock:
+        _code_embed_cache[key] = tuple(q_emb)
+        if len(_code_embed_cache) > CODE_EMBED_CACHE_MAXSIZE:
+            _code_embed_cache.popitem(last=False)
+    return q_emb
+
+
+def retrieve_security_docs(collection, code: str, k=3, q_emb=None):
+    if q_emb is None:
+        q_emb = _embed_code(code)
     res = collection.query(query_embeddings=[q_emb], n_results=k)
     
     docs = res["documents"][0] if "documents" in res else []
@@ -111,27 +151,141 @@ def retrieve_security_docs(collection, code: str, k=3):
 # -------------------------------------------------------------------
 # 3. Static Rule-Based Vulnerability Detection
 # -------------------------------------------------------------------
+# Patterns are compiled once at import. Multi-pattern rules also get a combined
+# alternation so code that matches none of them is rejected in a single scan.
+def _any_of(patterns, flags=0):
+    return re.compile("|".join(f"(?:{p})" for p in patterns), flags)
+
+def _single_line(pattern):
+    """Variant of a pattern that cannot match across a newline (mirrors a per-line search)."""
+    return pattern.replace(r"\s", r"[^\S\n]").replace("[^}]", "[^}\\n]")
+
+class _LineIndex:
+    """Maps character offsets in code to 1-based line numbers.
+
+    Newline positions are found lazily (one vectorized scan over the code's UTF-32 view, so
+    offsets stay in characters) and only when a rule actually reports lines; the code is
+    never split into per-line strings.
+    """
+
+    __slots__ = ("code", "_newlines")
+
+    def __init__(self, code: str):
+        self.code = code
+        self._newlines = None
+
+    def line_numbers(self, offsets) -> List[int]:
+        """Line number of each offset, in input order."""
+        if self._newlines is None:
+            chars = np.frombuffer(self.code.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+            self._newlines = np.flatnonzero(chars == 10)
+        starts = np.fromiter(offsets, dtype=np.intp)
+        return (np.searchsorted(self._newlines, starts) + 1).tolist()
+
+    def lines_at(self, offsets) -> List[int]:
+        """Distinct line numbers of the given offsets, ascending."""
+        return sorted(set(self.line_numbers(offsets)))
+
+    def match_lines(self, matches) -> List[int]:
+        return self.lines_at(m.start() for m in matches)
+
+# Literal tokens every rule needs before its regex can match. They are located once per call
+# (C-level str.find; regex only where the rule is case-insensitive), each rule's confirming
+# regex only runs when its token was hit, and rules that report token lines reuse the offsets.
+_LITERAL_TRIGGERS = {
+    "child_exec": ("child_process.exec",),
+    "requests_get": ("requests.get",),
+    "inner_html": ("innerHTML",),
+    "pickle": ("pickle",),
+    "debug": ("DEBUG", "debug="),
+    "route": ("@app.route",),
+    "eval": ("eval",),
+    "os_system": ("os.system",),
+    "subprocess": ("subprocess.run",),
+}
+_LITERAL_TRIGGERS_NOCASE = {
+    "md5": re.compile(r"md5", re.IGNORECASE),
+    "logging": re.compile(r"logging\.", re.IGNORECASE),
+    "sql": re.compile(r"select|insert|update|delete", re.IGNORECASE),
+    "secret": re.compile(r"api_key|token|password|secret", re.IGNORECASE),
+    "open": re.compile(r"open", re.IGNORECASE),
+}
+
+def _literal_hits(code: str) -> Dict[str, List[int]]:
+    """Map trigger tag -> start offsets of its tokens in code (tags without hits are omitted)."""
+    hits = {}
+    for tag, tokens in _LITERAL_TRIGGERS.items():
+        offsets = []
+        for token in tokens:
+            i = code.find(token)
+            while i != -1:
+                offsets.append(i)
+                i = code.find(token, i + 1)
+        if offsets:
+            hits[tag] = offsets
+    for tag, pattern in _LITERAL_TRIGGERS_NOCASE.items():
+        offsets = [m.start() for m in pattern.finditer(code)]
+        if offsets:
+            hits[tag] = offsets
+    return hits
+
+# Path traversal: open() called with f-string or concatenation that includes a variable inside a path.
+# Like the SQL rules below, these are line-scoped with bounded repeats so a long buffer
+# cannot trigger runaway backtracking.
+_PATH_TRAVERSAL_SOURCES = [
+    r"open\s*\(\s*f[\"\'][^\n\"\']{0,200}\{[^}]{1,200}\}[^\n\"\']{0,200}[\"\']\s*,",
+    r"open\s*\(\s*[\"\'][^\n\"\']{0,200}[\"\']\s*\+\s*\w+\s*,",
+]
+PATH_TRAVERSAL_PATTERNS = [re.compile(_single_line(p), re.IGNORECASE) for p in _PATH_TRAVERSAL_SOURCES]
+PATH_TRAVERSAL_RE = _any_of([p.pattern for p in PATH_TRAVERSAL_PATTERNS], re.IGNORECASE)
+
+# SQL injection: a finding needs a match within one line, so the patterns are line-scoped
+# (no DOTALL) and their gaps are bounded.
+_SQL_INJECTION_SOURCES = [
+    r'execute\s*\(\s*f["\'][^\n]{0,200}?(?:SELECT|INSERT|UPDATE|DELETE)',
+    r'execute\s*\(\s*["\'][^\n]{0,200}?\{[^\n]{0,200}?(?:SELECT|INSERT|UPDATE|DELETE)',
+    r'(?:SELECT|INSERT|UPDATE|DELETE)[^\n]{0,200}\+',
+]
+SQL_INJECTION_PATTERNS = [re.compile(_single_line(p), re.IGNORECASE) for p in _SQL_INJECTION_SOURCES]
+SQL_INJECTION_RE = _any_of([p.pattern for p in SQL_INJECTION_PATTERNS], re.IGNORECASE)
+
+_SECRET_SOURCES = [
+    r'(API_KEY|TOKEN|PASSWORD|SECRET)\s*=\s*["\'][^"\'\n]{10,}["\']',
+    r'(api_key|token|password|secret)\s*:\s*["\'][^"\'\n]{10,}["\']',
+]
+SECRET_PATTERNS = [re.compile(p, re.IGNORECASE) for p in _SECRET_SOURCES]
+SECRETS_RE = _any_of(_SECRET_SOURCES, re.IGNORECASE)
+
+EVAL_RE = re.compile(r'\beval\s*\(')
+EVAL_LINE_RE = re.compile(_single_line(EVAL_RE.pattern))
+CHILD_PROCESS_EXEC_RE = re.compile(r'child_process\.exec\s*\(')
+OS_SYSTEM_RE = re.compile(r'\bos\.system\s*\(')
+OS_SYSTEM_LINE_RE = re.compile(_single_line(OS_SYSTEM_RE.pattern))
+SUBPROCESS_SHELL_RE = re.compile(r'subprocess\.run\s*\(.*shell\s*=\s*True')
+SUBPROCESS_RUN_LINE_RE = re.compile(_single_line(r'subprocess\.run\s*\('))
+REQUESTS_GET_RE = re.compile(r'requests\.get\s*\(')
+URL_RE = re.compile(r'user[_\w]*url|url')
+PICKLE_LOAD_RE = re.compile(r'pickle\.loads?\s*\(')
+DEBUG_RE = _any_of([r"\bDEBUG\b\s*=\s*True", r"app\.run\(.*debug\s*=\s*True"])
+CSRF_POST_ROUTE_RE = re.compile(r"@app\.route\(.*methods=\[.*'POST'.*\)")
+CSRF_TOKEN_RE = re.compile(r'csrf|csrf_token|csrf_protect', re.IGNORECASE)
+SENSITIVE_LOGGING_RE = _any_of(
+    [r'logging\.info\s*\(.*password', r'logging\.debug\s*\(.*api[_ ]?token'], re.IGNORECASE
+)
+IDOR_ROUTE_RE = re.compile(r"@app\.route\([^)]*<\w+>[^)]*\)")
+AUTH_HINT_RE = re.compile(r'auth|login|required_role|current_user|authorize|permission', re.IGNORECASE)
+
+
 def run_static_analysis(code: str):
     vulnerabilities = []
-    lines = code.split("\n")
-
-    # ---- Path traversal detection (file open with user-controlled path segments) ----
-    # Heuristic: open() called with f-string or concatenation that includes a variable inside a path.
-    path_traversal_patterns = [
-        r"open\s*\(\s*f[\"\'][^\n\"\']*\{[^}]+\}[^\n\"\']*[\"\']\s*,",
-        r"open\s*\(\s*[\"\'][^\n\"\']*[\"\']\s*\+\s*\w+\s*,",
-    ]
+    # Line numbers come from match offsets: one scan over the code instead of a search per line
+    index = _LineIndex(code)
+    hits = _literal_hits(code)
 
     # ---- SQL Injection (more precise pattern) ----
-    sql_injection_patterns = [
-        r'execute\s*\(\s*f["\'].*?(SELECT|INSERT|UPDATE|DELETE)',
-        r'execute\s*\(\s*["\'].*?\{.*?(SELECT|INSERT|UPDATE|DELETE)',
-        r'(SELECT|INSERT|UPDATE|DELETE).*?\+.*?',
-    ]
-    
-    for pattern in sql_injection_patterns:
-        if re.search(pattern, code, re.IGNORECASE | re.DOTALL):
-            matching_lines = [i+1 for i, line in enumerate(lines) if re.search(pattern, line, re.IGNORECASE)]
+    if "sql" in hits and SQL_INJECTION_RE.search(code):
+        for pattern in SQL_INJECTION_PATTERNS:
+            matching_lines = index.match_lines(pattern.finditer(code))
             if matching_lines:
                 vulnerabilities.append({
                     "issue": "SQL Injection",
@@ -143,32 +297,23 @@ def run_static_analysis(code: str):
                 break
 
     # ---- Hardcoded secret ----
-    secret_patterns = [
-        r'(API_KEY|TOKEN|PASSWORD|SECRET)\s*=\s*["\'][^"\'\n]{10,}["\']',
-        r'(api_key|token|password|secret)\s*:\s*["\'][^"\'\n]{10,}["\']',
-    ]
-    
-    for pattern in secret_patterns:
-        matches = list(re.finditer(pattern, code, re.IGNORECASE))
-        if matches:
-            matching_lines = []
-            for match in matches[:3]:
-                line_num = code[:match.start()].count('\n') + 1
-                matching_lines.append(line_num)
-            
+    if "secret" in hits and SECRETS_RE.search(code):
+        for pattern in SECRET_PATTERNS:
+            # Distinct lines first, then cap, so two secrets on one line don't use up the slots
+            matching_lines = index.match_lines(pattern.finditer(code))
             if matching_lines:
                 vulnerabilities.append({
                     "issue": "Hardcoded Secret",
                     "severity": "critical",
                     "explanation": "Hardcoded credentials found in source code.",
-                    "line_numbers": matching_lines,
+                    "line_numbers": matching_lines[:3],
                     "fix_suggestion": "Use environment variables or secret managers."
                 })
                 break
 
     # ---- Dangerous eval() ----
-    if re.search(r'\beval\s*\(', code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if re.search(r'\beval\s*\(', line)]
+    if "eval" in hits and EVAL_RE.search(code):
+        matching_lines = index.match_lines(EVAL_LINE_RE.finditer(code))
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Arbitrary Code Execution (eval)",
@@ -179,8 +324,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- Command Injection ----
-    if re.search(r'child_process\.exec\s*\(', code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'child_process.exec' in line]
+    if "child_exec" in hits and CHILD_PROCESS_EXEC_RE.search(code):
+        matching_lines = index.lines_at(hits["child_exec"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Command Injection (exec)",
@@ -190,8 +335,8 @@ def run_static_analysis(code: str):
                 "fix_suggestion": "Use execFile or safe command execution."
             })
 
-    if re.search(r'\bos\.system\s*\(', code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if re.search(r'\bos\.system\s*\(', line)]
+    if "os_system" in hits and OS_SYSTEM_RE.search(code):
+        matching_lines = index.match_lines(OS_SYSTEM_LINE_RE.finditer(code))
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Command Injection (os.system)",
@@ -202,8 +347,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- subprocess.run with shell=True (command injection) ----
-    if re.search(r'subprocess\.run\s*\(.*shell\s*=\s*True', code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if re.search(r'subprocess\.run\s*\(', line)]
+    if "subprocess" in hits and SUBPROCESS_SHELL_RE.search(code):
+        matching_lines = index.match_lines(SUBPROCESS_RUN_LINE_RE.finditer(code))
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Command Injection (subprocess)",
@@ -214,8 +359,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- SSRF detection (requests.get on user-controlled URL) ----
-    if re.search(r'requests\.get\s*\(', code) and re.search(r'user[_\w]*url|url', code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'requests.get' in line]
+    if "requests_get" in hits and REQUESTS_GET_RE.search(code) and URL_RE.search(code):
+        matching_lines = index.lines_at(hits["requests_get"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "SSRF",
@@ -226,8 +371,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- XSS detection (innerHTML usage) ----
-    if re.search(r'innerHTML', code, re.IGNORECASE):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'innerHTML' in line]
+    if "inner_html" in hits:
+        matching_lines = index.lines_at(hits["inner_html"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Cross-Site Scripting (XSS)",
@@ -238,8 +383,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- Insecure deserialization (pickle) ----
-    if re.search(r'pickle\.loads\s*\(', code) or re.search(r'pickle\.load\s*\(', code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'pickle' in line]
+    if "pickle" in hits and PICKLE_LOAD_RE.search(code):
+        matching_lines = index.lines_at(hits["pickle"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Insecure Deserialization (pickle)",
@@ -250,8 +395,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- Weak crypto detection (MD5) ----
-    if re.search(r'hashlib\.md5\s*\(', code) or re.search(r'MD5', code, re.IGNORECASE):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'md5' in line.lower()]
+    if "md5" in hits:
+        matching_lines = index.lines_at(hits["md5"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Weak Cryptography (MD5)",
@@ -262,8 +407,8 @@ def run_static_analysis(code: str):
             })
 
     # ---- Debug mode enabled detection ----
-    if re.search(r"\bDEBUG\b\s*=\s*True", code) or re.search(r"app\.run\(.*debug\s*=\s*True", code):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'DEBUG' in line or 'debug=' in line]
+    if "debug" in hits and DEBUG_RE.search(code):
+        matching_lines = index.lines_at(hits["debug"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Debug mode enabled",
@@ -274,10 +419,10 @@ def run_static_analysis(code: str):
             })
 
     # ---- CSRF missing protection heuristic (simple) ----
-    if re.search(r"@app\.route\(.*methods=\[.*'POST'.*\)", code):
+    if "route" in hits and CSRF_POST_ROUTE_RE.search(code):
         # if no mention of CSRF or csrf_token nearby, flag
-        if not re.search(r'csrf|csrf_token|csrf_protect', code, re.IGNORECASE):
-            matching_lines = [i+1 for i, line in enumerate(lines) if '@app.route' in line]
+        if not CSRF_TOKEN_RE.search(code):
+            matching_lines = index.lines_at(hits["route"])
             if matching_lines:
                 vulnerabilities.append({
                     "issue": "Missing CSRF Protection",
@@ -288,8 +433,8 @@ def run_static_analysis(code: str):
                 })
 
     # ---- Sensitive data logging detection ----
-    if re.search(r'logging\.info\s*\(.*password', code, re.IGNORECASE) or re.search(r'logging\.debug\s*\(.*api[_ ]?token', code, re.IGNORECASE):
-        matching_lines = [i+1 for i, line in enumerate(lines) if 'logging.' in line.lower()]
+    if "logging" in hits and SENSITIVE_LOGGING_RE.search(code):
+        matching_lines = index.lines_at(hits["logging"])
         if matching_lines:
             vulnerabilities.append({
                 "issue": "Sensitive Data Logging",
@@ -299,9 +444,10 @@ def run_static_analysis(code: str):
                 "fix_suggestion": "Avoid logging secrets; mask or remove sensitive fields."
             })
 
-    for pattern in path_traversal_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            matching_lines = [i + 1 for i, line in enumerate(lines) if re.search(pattern, line, re.IGNORECASE)]
+    # ---- Path traversal detection (file open with user-controlled path segments) ----
+    if "open" in hits and PATH_TRAVERSAL_RE.search(code):
+        for pattern in PATH_TRAVERSAL_PATTERNS:
+            matching_lines = index.match_lines(pattern.finditer(code))
             if matching_lines:
                 vulnerabilities.append({
                     "issue": "Path Traversal",
@@ -313,9 +459,9 @@ def run_static_analysis(code: str):
                 break
 
     # ---- IDOR heuristic: endpoint with path param and no auth check ----
-    if re.search(r"@app\.route\([^)]*<\w+>[^)]*\)", code):
-        if not re.search(r'auth|login|required_role|current_user|authorize|permission', code, re.IGNORECASE):
-            matching_lines = [i+1 for i, line in enumerate(lines) if '@app.route' in line]
+    if "route" in hits and IDOR_ROUTE_RE.search(code):
+        if not AUTH_HINT_RE.search(code):
+            matching_lines = index.lines_at(hits["route"])
             if matching_lines:
                 vulnerabilities.append({
                     "issue": "IDOR (missing authorization)",
@@ -329,38 +475,261 @@ def run_static_analysis(code: str):
 
 
 # -------------------------------------------------------------------
-# 4. Hybrid AI Security Analysis
+# 4. Review cache for LLM reviews
 # -------------------------------------------------------------------
-async def analyze_code_security(code: str, language: str = "auto"):
-    
-    print(f"\n[Security Analysis] Analyzing {len(code)} characters of code")
-    print(f"[Security Analysis] First 200 chars: {code[:200]}...")
+# Parsed LLM reviews, with the RAG docs they were grounded on, keyed by the blake2b digest of
+# the analysed code. Only identical code hits: MiniLM only sees the first 256 tokens, so a close
+# embedding says nothing about the rest of the file. A hit skips the embedding, the RAG query
+# and the LLM call. Static findings are always recomputed, and AI findings still have to be
+# corroborated against the current code before they are merged.
+REVIEW_CACHE_TTL = 3600  # seconds
+REVIEW_CACHE_MAXSIZE = 512
+_review_cache = OrderedDict()
+
+
+def _is_security_review(parsed) -> bool:
+    """True if an LLM reply has the review schema (rejects mock/fallback payloads)."""
+    return (
+        isinstance(parsed, dict)
+        and isinstance(parsed.get("vulnerabilities"), list)
+        and "risk_score" in parsed
+    )
+
+
+def _review_cache_lookup(code_key: bytes):
+    """(parsed review, rag_docs) for recently reviewed identical code, else None."""
+    hit = _review_cache.get(code_key)
+    if hit is None:
+        return None
+    stored_at, parsed, rag_docs = hit
+    if time.monotonic() - stored_at >= REVIEW_CACHE_TTL:
+        del _review_cache[code_key]
+        return None
+    _review_cache.move_to_end(code_key)
+    # analyze_code_security rewrites vulnerability dicts in place, so callers get their own copy
+    return copy.deepcopy(parsed), [dict(r) for r in rag_docs]
+
+
+def _review_cache_store(code_key: bytes, parsed, rag_docs):
+    if not _is_security_review(parsed):
+        return
+    _review_cache[code_key] = (time.monotonic(), copy.deepcopy(parsed), tuple(dict(r) for r in rag_docs))
+    _review_cache.move_to_end(code_key)
+    if len(_review_cache) > REVIEW_CACHE_MAXSIZE:
+        _review_cache.popitem(last=False)
+
+
+# -------------------------------------------------------------------
+# 5. AI finding corroboration
+# -------------------------------------------------------------------
+# Generic/uncorroborated categories from the LLM are never accepted; they tend to be
+# noisy and break deterministic evaluation.
+_REJECTED_AI_ISSUES = (
+    "missing_input_validation", "missing input validation", "missing authentication",
+    "missing_authentication", "weak_password_hashing", "weak password",
+)
+
+# (category, issue classifier) in priority order; the first classifier that matches the
+# lowercased issue name decides which code evidence is required.
+_AI_ISSUE_CLASSIFIERS = [
+    ("sql", re.compile(r"sql")),
+    ("command", re.compile(r"command|subprocess|os\.system")),
+    ("pickle", re.compile(r"pickle|deserial")),
+    ("eval", re.compile(r"eval|arbitrary code")),
+    ("xss", re.compile(r"xss|innerhtml")),
+    ("ssrf", re.compile(r"ssrf")),
+    ("secret", re.compile(r"hardcod|secret|api_key")),
+    ("idor", re.compile(r"idor")),
+    ("csrf", re.compile(r"csrf")),
+    ("path_traversal", re.compile(r"^(?=.*path)(?=.*travers)", re.DOTALL)),
+]
+
+# Category -> evidence regex the code must contain for the AI finding to be accepted
+VERIFIERS = {
+    # dynamic SQL: f-string SELECT, string concatenation or .format()
+    "sql": re.compile(r"""(?i:f\s*".*select)|\+\s*['"]|format\s*\("""),
+    "command": re.compile(r'subprocess\.run\s*\(|os\.system\s*\(|child_process\.exec'),
+    "pickle": re.compile(r'pickle', re.IGNORECASE),
+    "eval": re.compile(r'eval\(', re.IGNORECASE),
+    "xss": re.compile(r'innerhtml', re.IGNORECASE),
+    "ssrf": re.compile(r'requests\.(?:get|post)', re.IGNORECASE),
+    "secret": re.compile(r'(api_key|token|password|secret)\s*=\s*["\']', re.IGNORECASE),
+    "idor": IDOR_ROUTE_RE,
+    "csrf": CSRF_POST_ROUTE_RE,
+    "path_traversal": PATH_TRAVERSAL_RE,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _classify_ai_issue(issue: str):
+    if any(k in issue for k in _REJECTED_AI_ISSUES):
+        return None
+    for category, classifier in _AI_ISSUE_CLASSIFIERS:
+        if classifier.search(issue):
+            return category
+    return None
+
+
+def verify_ai_finding(v: Dict[str, Any], code_text: str) -> bool:
+    """Return True if AI finding is corroborated by heuristics against the code."""
+    category = _classify_ai_issue((v.get("issue") or "").lower())
+    # default: reject unknown AI findings to stay deterministic
+    if category is None:
+        return False
+    return VERIFIERS[category].search(code_text) is not None
+
+
+# Lowercased issue name -> canonical key used by tests; first matching rule wins.
+_CANON_RULES = [
+    (re.compile(r"^(?=.*sql)(?=.*inject)", re.DOTALL), "sql_injection"),
+    (re.compile(r"^(?=.*command)(?=.*inject)", re.DOTALL), "command_injection"),
+    (re.compile(r"subprocess|os\.system|child_process\.exec"), "command_injection"),
+    (re.compile(r"hardcod|api key|api_token|api token|secret"), "hardcoded_secrets"),
+    (re.compile(r"path traversal|path_traversal"), "path_traversal"),
+    (re.compile(r"deserial|pickle"), "insecure_deserialization"),
+    (re.compile(r"md5|weak crypt"), "weak_crypto"),
+    (re.compile(r"debug"), "debug_enabled"),
+    (re.compile(r"xss|innerhtml|inner html"), "xss_vulnerability"),
+    (re.compile(r"ssrf|requests\.get|user_url"), "ssrf_vulnerability"),
+    (re.compile(r"idor|insecure direct object"), "idor_vulnerability"),
+    (re.compile(r"^(?=.*sensitive)(?=.*(?:log|password))", re.DOTALL), "sensitive_data_exposure"),
+    (re.compile(r"csrf"), "csrf_vulnerability"),
+    (re.compile(r"eval|arbitrary code|code execution"), "command_injection"),
+]
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=256)
+def canonicalize_issue(issue: str) -> str:
+    s = (issue or "").lower()
+    for pattern, key in _CANON_RULES:
+        if pattern.search(s):
+            return key
+    norm = _NON_ALNUM.sub("_", s).strip("_")
+    return norm or s
+
+
+# Local repair for near-miss LLM JSON (fences, prose around the object, trailing commas)
+_FENCE_RE = re.compile(r"^[ \t]*```[^\n]*\n?", re.MULTILINE)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+def _outermost_object(text: str):
+    """Slice the first balanced {...} span, ignoring braces inside string literals."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_str = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _repair_json(raw: str):
+    """Best-effort parse of an LLM reply without another round trip; None if unrecoverable."""
+    cleaned = _FENCE_RE.sub("", raw or "").strip()
+    candidate = _outermost_object(cleaned)
+    if candidate is None:
+        return None
+    for text in (candidate, _TRAILING_COMMA_RE.sub(r"\1", candidate)):
+        try:
+            parsed = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+# -------------------------------------------------------------------
+# 6. Hybrid AI Security Analysis
+# -------------------------------------------------------------------
+# Prompt budget: the LLM only verifies/extends static findings, so it gets issue, severity and
+# a few lines per finding rather than the full records, and a clipped excerpt of each RAG doc
+PROMPT_STATIC_LINES = 3
+PROMPT_RAG_DOC_CHARS = 400
 
-    # --- STATIC ANALYSIS FIRST (guaranteed vulnerabilities detection) ---
-    static_vulns = run_static_analysis(code)
+# Deterministic penalty model aligned to evaluation fixture bands:
+# - Single critical -> ~20 (0-30/25)
+# - Single high -> ~45 (20-60/50)
+# - Single medium -> ~60 (40-70)
+# - Multiple critical -> 0-20
+SEVERITY_PENALTY = {"critical": 80.0, "high": 55.0, "medium": 40.0, "low": 15.0}
+
+
+def _security_rag(code: str, code_key: bytes):
+    q_emb = _embed_code(code, code_key)
+    col = _get_security_collection()
+    return retrieve_security_docs(col, code, k=3, q_emb=q_emb)
+
+
+async def analyze_code_security(code: str, language: str = "auto"):
+    # Slices, length and content hash are taken once and shared by logging, prompt and caches
+    code_len = len(code)
+    code_head200 = code[:200]
+    code_head5000 = code[:5000] if code_len > 5000 else code
+    code_key = _code_digest(code)
+
+    print(f"\n[Security Analysis] Analyzing {code_len} characters of code")
+    print(f"[Security Analysis] First 200 chars: {code_head200}...")
+
+    # Identical code reuses a recent review (and its RAG docs) instead of embedding and an LLM round trip
+    parsed = None
+    cached = _review_cache_lookup(code_key)
+    if cached is not None:
+        parsed, rag_docs = cached
+        static_vulns = await asyncio.to_thread(run_static_analysis, code)
+    else:
+        # --- Static analysis (guaranteed vulnerabilities detection) + seed/retrieve RAG ---
+        # Both are CPU/IO bound and independent, so they run side by side off the event loop
+        static_vulns, rag_docs = await asyncio.gather(
+            asyncio.to_thread(run_static_analysis, code),
+            asyncio.to_thread(_security_rag, code, code_key),
+        )
     print(f"[Security Analysis] Found {len(static_vulns)} static vulnerabilities")
 
-    # --- Seed + retrieve RAG ---
-    col = seed_security_collection()
-    rag_docs = retrieve_security_docs(col, code, k=3)
-    rag_context = "\n\n".join([f"ID:{r['id']}\n{r['text']}" for r in rag_docs])
+    if parsed is not None:
+        print(f"[Security Analysis] Review cache hit, skipping RAG and LLM review")
+    else:
+        rag_context = "\n\n".join([f"ID:{r['id']}\n{r['text'][:PROMPT_RAG_DOC_CHARS]}" for r in rag_docs])
+        static_summary = [
+            {"issue": v["issue"], "severity": v["severity"], "lines": v["line_numbers"][:PROMPT_STATIC_LINES]}
+            for v in static_vulns
+        ]
 
-    # --- LLM-enhanced vulnerability analysis with deep investigation ---
-    ai_prompt = f"""You are an Expert Application Security Auditor performing a comprehensive security review.
+        # --- LLM-enhanced vulnerability analysis with deep investigation ---
+        ai_prompt = f"""You are an Expert Application Security Auditor performing a comprehensive security review.
 
 === CODE UNDER ANALYSIS ===
 Language: {language}
-Total Length: {len(code)} characters
+Total Length: {code_len} characters
 Files Analyzed: Multiple source files from repository
 
 Code Content:
 ```
-{code[:5000]}
+{code_head5000}
 ```
-{f"... ({len(code) - 5000} more characters)" if len(code) > 5000 else ""}
+{f"... ({code_len - 5000} more characters)" if code_len > 5000 else ""}
 
 === STATIC ANALYSIS RESULTS ===
-{json.dumps(static_vulns, indent=2) if static_vulns else "No static vulnerabilities detected"}
+{orjson.dumps(static_summary).decode() if static_summary else "No static vulnerabilities detected"}
 
 === SECURITY KNOWLEDGE BASE (RAG) ===
 {rag_context}
@@ -435,19 +804,29 @@ Return ONLY valid JSON (no markdown, no explanations outside JSON):
 
 CRITICAL: Only report vulnerabilities that ACTUALLY EXIST in the provided code. Do not make assumptions."""
 
-    raw = await call_chat(ai_prompt, temperature=0.1, max_tokens=1500)
+        raw = await call_chat(ai_prompt, temperature=0.1, max_tokens=1500)
 
-    # Fix JSON if needed
-    try:
-        parsed = json.loads(raw)
-    except:
-        print(f"[Security Analysis] JSON parse failed, attempting fix...")
-        fix_prompt = f"Convert the following to strict valid JSON (no markdown):\n{raw}"
-        fixed = await call_chat(fix_prompt, temperature=0.1, max_tokens=1200)
+        # Fix JSON if needed
         try:
-            parsed = json.loads(fixed)
+            parsed = orjson.loads(raw)
         except:
-            print(f"[Security Analysis] JSON fix failed, using static results only")
+            parsed = _repair_json(raw)
+
+        if parsed is None:
+            print(f"[Security Analysis] JSON parse failed, attempting fix...")
+            fix_prompt = f"Convert the following to strict valid JSON (no markdown):\n{raw}"
+            fixed = await call_chat(fix_prompt, temperature=0.1, max_tokens=1200)
+            try:
+                parsed = orjson.loads(fixed)
+            except:
+                parsed = _repair_json(fixed)
+
+        # Provider failures come back as parseable mock JSON, so the schema decides what counts
+        # as a review; anything else falls back to static results and is never cached
+        if _is_security_review(parsed):
+            _review_cache_store(code_key, parsed, rag_docs)
+        else:
+            print(f"[Security Analysis] No usable LLM review, using static results only")
             parsed = {
                 "vulnerabilities": static_vulns,
                 "risk_score": sum(25 if v["severity"]=="critical" else 15 if v["severity"]=="high" else 8 for v in static_vulns),
@@ -462,46 +841,6 @@ CRITICAL: Only report vulnerabilities that ACTUALLY EXIST in the provided code.
     static_issue_names = {v.get("issue", "").lower() for v in static_vulns}
 
     # Add AI findings without duplicates (based on issue name)
-    def verify_ai_finding(v: Dict[str, Any], code_text: str) -> bool:
-        """Return True if AI finding is corroborated by heuristics against the code."""
-        issue = (v.get("issue") or "").lower()
-        txt = code_text.lower()
-        # Never accept generic/uncorroborated categories from the LLM.
-        # These tend to be noisy and break deterministic evaluation.
-        if any(k in issue for k in ["missing_input_validation", "missing input validation", "missing authentication", "missing_authentication", "weak_password_hashing", "weak password"]):
-            return False
-        # simple keyword heuristics
-        if "sql" in issue or "sql_injection" in issue:
-            # require evidence of dynamic SQL (f-strings, format, + concatenation)
-            if re.search(r'f\s*".*select', code_text, re.IGNORECASE) or re.search(r"\+\s*['\"]", code_text) or re.search(r'format\s*\(', code_text):
-                return True
-            return False
-        if "command" in issue or "subprocess" in issue or "os.system" in issue:
-            if re.search(r'subprocess\.run\s*\(|os\.system\s*\(|child_process\.exec', code_text):
-                return True
-            return False
-        if "pickle" in issue or "deserial" in issue:
-            return 'pickle' in txt
-        if "eval" in issue or "arbitrary code" in issue:
-            return 'eval(' in txt
-        if "xss" in issue or "innerhtml" in issue:
-            return 'innerhtml' in txt
-        if "ssrf" in issue:
-            return 'requests.get' in txt or 'requests.post' in txt
-        if "hardcod" in issue or "secret" in issue or "api_key" in issue:
-            return re.search(r'(api_key|token|password|secret)\s*=\s*["\']', code_text, re.IGNORECASE) is not None
-        if "idor" in issue:
-            return re.search(r"@app\.route\([^)]*<\w+>[^)]*\)", code_text) is not None
-        if "csrf" in issue:
-            return re.search(r"@app\.route\(.*methods=\[.*'POST'.*\)", code_text) is not None
-        if "path" in issue and ("travers" in issue or "traversal" in issue):
-            return (
-                re.search(r"open\s*\(\s*f[\"\'][^\n\"\']*\{[^}]+\}[^\n\"\']*[\"\']\s*,", code_text, re.IGNORECASE) is not None
-                or re.search(r"open\s*\(\s*[\"\'][^\n\"\']*[\"\']\s*\+\s*\w+\s*,", code_text, re.IGNORECASE) is not None
-            )
-        # default: reject unknown AI findings to stay deterministic
-        return False
-
     for v in ai_vulns:
         issue_name = v.get("issue", "").lower()
         if issue_name in static_issue_names:
@@ -515,55 +854,17 @@ CRITICAL: Only report vulnerabilities that ACTUALLY EXIST in the provided code.
     
     print(f"[Security Analysis] Total vulnerabilities after merge: {len(all_vulns)}")
 
-    # --- Normalize issue names to canonical keys used by tests ---
-    def canonicalize_issue(issue: str) -> str:
-        s = (issue or "").lower()
-        if "sql" in s and "inject" in s:
-            return "sql_injection"
-        if "command" in s and "inject" in s:
-            return "command_injection"
-        if "subprocess" in s or "os.system" in s or "child_process.exec" in s:
-            return "command_injection"
-        if "hardcod" in s or "api key" in s or "api_token" in s or "api token" in s or "secret" in s:
-            return "hardcoded_secrets"
-        if "path traversal" in s or "path_traversal" in s:
-            return "path_traversal"
-        if "deserial" in s or "pickle" in s or "unsafe deserial" in s:
-            return "insecure_deserialization"
-        if "md5" in s or "weak crypt" in s or "weak cryptography" in s:
-            return "weak_crypto"
-        if "debug" in s and ("mode" in s or "debug" in s):
-            return "debug_enabled"
-        if "xss" in s or "innerhtml" in s or "inner html" in s:
-            return "xss_vulnerability"
-        if "ssrf" in s or "requests.get" in s or "user_url" in s:
-            return "ssrf_vulnerability"
-        if "idor" in s or "insecure direct object" in s:
-            return "idor_vulnerability"
-        if "sensitive" in s and ("log" in s or "logging" in s or "password" in s):
-            return "sensitive_data_exposure"
-        if "csrf" in s:
-            return "csrf_vulnerability"
-        if "eval" in s or "arbitrary code" in s or "code execution" in s:
-            return "command_injection"
-
-        norm = re.sub(r"[^a-z0-9]+", "_", s).strip("_")
-        return norm or s
-
+    # --- Normalize issue names to canonical keys used by tests; severity penalties are
+    # accumulated in the same pass ---
+    total_penalty = 0.0
     for v in all_vulns:
         orig = v.get("issue", "")
         canon = canonicalize_issue(orig)
         v["original_issue"] = orig
         v["issue"] = canon
+        total_penalty += SEVERITY_PENALTY.get((v.get("severity") or "low").lower(), 15.0)
 
     # Calculate security score (0-100, higher is better)
-    # Deterministic penalty model aligned to evaluation fixture bands:
-    # - Single critical -> ~20 (0-30/25)
-    # - Single high -> ~45 (20-60/50)
-    # - Single medium -> ~60 (40-70)
-    # - Multiple critical -> 0-20
-    severity_penalty = {"critical": 80.0, "high": 55.0, "medium": 40.0, "low": 15.0}
-    total_penalty = sum(severity_penalty.get((v.get("severity") or "low").lower(), 15.0) for v in all_vulns)
     security_score = max(0.0, 100.0 - total_penalty)
     
     # Calculate risk level
@@ -1,12 +1,28 @@
+import asyncio
+import functools
+import hashlib
 import json
+import os
+import re
+import threading
+import time
 from typing import List, Optional
 
+import numpy as np
 from pydantic import BaseModel, Field, ValidationError
 
-from app.core.Utils.llm_client import _call_gemini, _call_groq
+from app.core.Utils.llm_client import (
+    LLMUnavailableError,
+    _call_gemini,
+    _call_groq,
+    _call_groq_stream,
+    is_mock_response,
+)
+from app.core.RAGANDEMBEDDINGS.seed import seed_kb
 from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
 from app.core.RAGANDEMBEDDINGS.embeddings import embed
-from app.core.RAGANDEMBEDDINGS.uml_rag_data import uml_knowledge
+from app.core.RAGANDEMBEDDINGS.flat_index import build_flat_index, topk_ip
+from app.core.RAGANDEMBEDDINGS.uml_rag_data import UML_IDS, UML_TEXTS, uml_knowledge
 
 # --------- Limits & Defaults ---------
 MAX_DESC_LEN = 2000
@@ -15,6 +31,61 @@ MAX_RAW_LEN = 4000
 MAX_MERMAID_LEN = 1200
 MAX_TEXT_LEN = 200
 MAX_DIAGRAMS = 4
+_TEXT_CLIP = slice(0, MAX_TEXT_LEN)
+_MERMAID_CLIP = slice(0, MAX_MERMAID_LEN)
+QUERY_EMBED_CACHE_MAXSIZE = 1024
+# Seconds; grounding is best effort and must not delay the LLM call. Assumes a warm process
+# (see warm_uml_retrieval), so it only has to cover the embedding and the index query.
+UML_RAG_TIMEOUT = float(os.getenv("UML_RAG_TIMEOUT", "0.15"))
+
+_FENCE_RE = re.compile(r"^[ \t]*```[^\n]*\n?", re.MULTILINE)  # whole ``` / ```json fence lines
+_JSON_STRUCT_RE = re.compile(r'[{}"\\]')  # the only characters that move object/string state
+
+# UML_INDEX_INT8=1 serves retrieval from an in-process int8 flat index (per-row scales, 4x
+# smaller than float32) instead of Chroma, which only stores float32 vectors
+UML_INDEX_INT8 = os.getenv("UML_INDEX_INT8", "0") == "1"
+
+# Explicit HNSW build/search parameters for the UML knowledge index (set at creation time)
+UML_HNSW_METADATA = {"hnsw:M": 16, "hnsw:construction_ef": 200, "hnsw:search_ef": 64}
+
+
+# --------- Prompt ---------
+# Constant parts of the generate_uml prompt; only the description, type and context vary
+_PROMPT_HEAD = "You are an expert software architect and UML designer."
+
+_PROMPT_SCHEMA = """Produce a comprehensive architecture analysis and multiple Mermaid diagrams covering the most useful views for this codebase. The output MUST be a single JSON object matching this EXACT schema (no markdown, no code fences, no extra text):
+
+{
+    "diagrams": [
+        {
+            "type": "class|sequence|flowchart|erd|dependency",
+            "title": "string",
+            "mermaid": "string",    // mermaid diagram text with newlines escaped as \n
+            "description": "string"
+        }
+    ],
+    "apiRoutes": [ { "method": "GET|POST|PUT|DELETE", "path": "/api/..", "description": "string" } ],
+    "folderStructure": "string (tree view)",
+    "summary": {
+            "classesCount": int,
+            "endpointsCount": int,
+            "dependenciesCount": int,
+            "architectureType": "monolith|microservices|serverless|unknown",
+            "complexity": "low|medium|high",
+            "languages": ["python","js"]
+    }
+}"""
+
+_PROMPT_RULES = """Rules:
+1) Return ONLY the JSON object exactly matching the schema (no markdown, no code fences).
+2) Provide at least two diagrams (if possible): one structural (class/dependency) and one behavioral (sequence/flowchart).
+3) Limit diagrams to at most 4 items; each mermaid string <= 1200 characters; titles/descriptions <= 200 characters.
+4) Escape newlines in mermaid as \n; do not include backticks or fencing.
+5) Populate summary fields with best-effort counts and inferred architectureType and complexity.
+6) Do NOT invent external URLs or secrets; only use info provided by the user or grounding context.
+
+Begin.
+"""
 
 
 # --------- Pydantic Schemas ---------
@@ -46,89 +117,246 @@ class UMLResponseModel(BaseModel):
     folderStructure: str = Field("", max_length=1000)
     summary: SummaryModel = Field(default_factory=SummaryModel)
 
+def _strip_fences(text: str) -> str:
+    # One regex pass instead of split -> filter -> join
+    return _FENCE_RE.sub("", text).strip()
+
+class _ObjectScanner:
+    """Incrementally finds complete top-level {...} spans in streamed text.
+
+    String literals (and escapes inside them) are honoured; text outside objects is skipped.
+    State carries across push() calls, so each character is scanned once.
+    """
+
+    __slots__ = ("text", "cursor", "depth", "start", "in_str", "skip")
+
+    def __init__(self):
+        self.text = ""
+        self.cursor = 0
+        self.depth = 0
+        self.start = -1
+        self.in_str = False
+        self.skip = -1
+
+    def push(self, chunk: str) -> None:
+        self.text += chunk
+
+    def next_object(self):
+        """(start, end) of the next complete top-level object, or None until more text arrives."""
+        for m in _JSON_STRUCT_RE.finditer(self.text, self.cursor):
+            i = m.start()
+            if i == self.skip:
+                continue
+            ch = m.group()
+            if self.in_str:
+                if ch == "\\":
+                    self.skip = i + 1
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == "{":
+                if self.depth == 0:
+                    self.start = i
+                self.depth += 1
+            elif self.depth == 0:
+                continue
+            elif ch == '"':
+                self.in_str = True
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.cursor = i + 1
+                    return self.start, i + 1
+        self.cursor = len(self.text)
+        return None
+
+
+async def _stream_uml_reply(prompt: str) -> str:
+    """Stream the UML completion and stop reading once a complete JSON object has arrived."""
+    scanner = _ObjectScanner()
+    try:
+        stream = _call_groq_stream(prompt, model="llama-3.3-70b-versatile", max_tokens=1600, temperature=0.15)
+        try:
+            async for piece in stream:
+                scanner.push(piece)
+                span = scanner.next_object()
+                while span is not None:
+                    candidate = scanner.text[span[0]:span[1]]
+                    try:
+                        json.loads(candidate)
+                        # Trailing fence/prose is never read; validation starts right away
+                        return candidate
+                    except json.JSONDecodeError:
+                        span = scanner.next_object()
+        finally:
+            await stream.aclose()
+    except LLMUnavailableError:
+        # No key: the blocking client returns its mock payload without a network call
+        pass
+    except Exception as e:
+        if scanner.text.strip():
+            # Keep what already arrived; the repair path copes with a truncated reply
+            print(f"[UML Agent] Groq stream interrupted after {len(scanner.text)} chars: {e}")
+            return scanner.text
+        print(f"[UML Agent] Groq stream failed before any output, retrying without streaming: {e}")
+    if scanner.text.strip():
+        return scanner.text
+    return await _call_groq(prompt, model="llama-3.3-70b-versatile", max_tokens=1600, temperature=0.15)
+
 # seed UML knowledge into vector DB
 def seed_uml_collection():
-    col = get_or_create_collection("uml_knowledge")
-    if col.count() == 0:
-        texts = [x["text"] for x in uml_knowledge]
-        ids = [x["id"] for x in uml_knowledge]
-        emb = embed(texts)
-        col.add(documents=texts, ids=ids, embeddings=emb)
-    return col
-
-def retrieve_uml_context(query: str, k=3):
+    return seed_kb(
+        "uml_knowledge", uml_knowledge, metadata=UML_HNSW_METADATA, ids=UML_IDS, texts=UML_TEXTS
+    )
+
+_UML_COL = None
+_UML_COL_LOCK = threading.Lock()
+
+def _get_uml_collection():
+    """Seeded UML collection, created once per process."""
+    global _UML_COL
+    if _UML_COL is None:
+        with _UML_COL_LOCK:
+            if _UML_COL is None:
+                _UML_COL = seed_uml_collection()
+    return _UML_COL
+
+_UML_INT8_INDEX = None  # (int8 matrix, row scales, ids, texts)
+
+def _get_uml_int8_index():
+    global _UML_INT8_INDEX
+    if _UML_INT8_INDEX is None:
+        with _UML_COL_LOCK:
+            if _UML_INT8_INDEX is None:
+                _UML_INT8_INDEX = build_flat_index(
+                    "uml_knowledge", uml_knowledge, int8=True, ids=UML_IDS, texts=UML_TEXTS
+                )
+    return _UML_INT8_INDEX
+
+@functools.lru_cache(maxsize=QUERY_EMBED_CACHE_MAXSIZE)
+def _embed_query(query: str) -> tuple:
+    # Repeated descriptions skip the encoder; tuples keep cached vectors immutable
+    return tuple(embed([query])[0])
+
+def retrieve_uml_context_sync(query: str, k=3):
     try:
-        col = seed_uml_collection()
-        q_emb = embed([query])[0]
-        res = col.query(query_embeddings=[q_emb], n_results=k)
+        if UML_INDEX_INT8:
+            matrix, scales, all_ids, all_texts = _get_uml_int8_index()
+            top = topk_ip(matrix, np.asarray(_embed_query(query), dtype=np.float32), k, scales).tolist()
+            ids = [all_ids[i] for i in top]
+            docs = [all_texts[i] for i in top]
+        else:
+            col = _get_uml_collection()
+            q_emb = list(_embed_query(query))
+            res = col.query(query_embeddings=[q_emb], n_results=k)
 
-        docs = res.get("documents", [[]])[0] if res else []
-        ids = res.get("ids", [[]])[0] if res else []
+            docs = res.get("documents", [[]])[0] if res else []
+            ids = res.get("ids", [[]])[0] if res else []
         if not docs:
             return ""
-        rag_context = "\n\n".join([f"ID:{ids[i] if i < len(ids) else f'kb-{i}'}\n{docs[i]}" for i in range(len(docs))])
-        return rag_context[:MAX_RAG_LEN]
+        # Pad missing ids once instead of guarding every element
+        if len(ids) < len(docs):
+            ids = list(ids) + [f"kb-{i}" for i in range(len(ids), len(docs))]
+        # Stop collecting once the budget is covered rather than joining everything and slicing
+        parts = []
+        size = -2
+        for doc_id, doc in zip(ids, docs):
+            part = f"ID:{doc_id}\n{doc}"
+            parts.append(part)
+            size += len(part) + 2
+            if size >= MAX_RAG_LEN:
+                break
+        return "\n\n".join(parts)[:MAX_RAG_LEN]
     except Exception:
         return ""
 
+def warm_uml_retrieval():
+    """Seed the UML index and run one encode so the first request's grounding fits the budget."""
+    if UML_INDEX_INT8:
+        _get_uml_int8_index()
+    else:
+        _get_uml_collection()
+    _get_uml_cache_collection()
+    embed(["warm up"])
 
-async def generate_uml(description: str, uml_type: str = "auto"):
-    # Retrieve grounding context (best effort)
-    safe_description = (description or "").strip()[:MAX_DESC_LEN]
-    rag_context = retrieve_uml_context(safe_description)
+async def retrieve_uml_context(query: str, k=3):
+    # Seeding, embedding and the Chroma query all block; run them off the event loop
+    return await asyncio.to_thread(retrieve_uml_context_sync, query, k)
 
-    # Build LLM prompt asking for multiple diagrams and architecture summary
-    prompt = f"""You are an expert software architect and UML designer.
 
-User Description:
-{safe_description}
+# --------- Response cache for LLM responses ---------
+# Validated responses keyed by blake2b(uml_type, description); only an identical request hits.
+# A close description embedding is not enough: MiniLM only reads the first 256 tokens of a
+# description that may run to MAX_DESC_LEN, so specs sharing an opening paragraph or differing
+# in a late requirement embed almost identically. Entries expire after the TTL.
+UML_CACHE_COLLECTION = "uml_llm_cache"
+UML_CACHE_TTL = 3600  # seconds
 
-Requested UML type: {uml_type}
+_uml_cache_col = None
 
-Use the provided UML best-practices and examples for grounding:
-{rag_context}
+def _get_uml_cache_collection():
+    global _uml_cache_col
+    if _uml_cache_col is None:
+        _uml_cache_col = get_or_create_collection(UML_CACHE_COLLECTION)
+    return _uml_cache_col
 
-Produce a comprehensive architecture analysis and multiple Mermaid diagrams covering the most useful views for this codebase. The output MUST be a single JSON object matching this EXACT schema (no markdown, no code fences, no extra text):
+def _uml_cache_key(description: str, uml_type: str) -> str:
+    data = f"{uml_type}\0{description}".encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
-{{
-    "diagrams": [
-        {{
-            "type": "class|sequence|flowchart|erd|dependency",
-            "title": "string",
-            "mermaid": "string",    // mermaid diagram text with newlines escaped as \n
-            "description": "string"
-        }}
-    ],
-    "apiRoutes": [ {{ "method": "GET|POST|PUT|DELETE", "path": "/api/..", "description": "string" }} ],
-    "folderStructure": "string (tree view)",
-    "summary": {{
-            "classesCount": int,
-            "endpointsCount": int,
-            "dependenciesCount": int,
-            "architectureType": "monolith|microservices|serverless|unknown",
-            "complexity": "low|medium|high",
-            "languages": ["python","js"]
-    }}
-}}
+def _uml_cache_lookup(description: str, uml_type: str):
+    try:
+        res = _get_uml_cache_collection().get(
+            ids=[_uml_cache_key(description, uml_type)], include=["documents", "metadatas"]
+        )
+        if not res["ids"]:
+            return None
+        if time.time() - (res["metadatas"][0] or {}).get("ts", 0) > UML_CACHE_TTL:
+            return None
+        return json.loads(res["documents"][0])
+    except Exception as e:
+        print(f"[UML Agent] Response cache lookup failed: {e}")
+        return None
 
-Rules:
-1) Return ONLY the JSON object exactly matching the schema (no markdown, no code fences).
-2) Provide at least two diagrams (if possible): one structural (class/dependency) and one behavioral (sequence/flowchart).
-3) Limit diagrams to at most 4 items; each mermaid string <= 1200 characters; titles/descriptions <= 200 characters.
-4) Escape newlines in mermaid as \n; do not include backticks or fencing.
-5) Populate summary fields with best-effort counts and inferred architectureType and complexity.
-6) Do NOT invent external URLs or secrets; only use info provided by the user or grounding context.
+def _uml_cache_store(description: str, uml_type: str, payload: dict):
+    try:
+        # Chroma rows need a vector; the description embedding is already cached for RAG
+        _get_uml_cache_collection().upsert(
+            ids=[_uml_cache_key(description, uml_type)],
+            embeddings=[list(_embed_query(description))],
+            documents=[json.dumps(payload)],
+            metadatas=[{"ts": time.time(), "uml_type": uml_type}],
+        )
+    except Exception as e:
+        print(f"[UML Agent] Response cache store failed: {e}")
 
-Begin.
-"""
+async def generate_uml(description: str, uml_type: str = "auto"):
+    safe_description = (description or "").strip()[:MAX_DESC_LEN]
+    # The exact-key cache lookup runs before, and outside, the UML_RAG_TIMEOUT grounding
+    # budget; a hit skips retrieval and the LLM entirely
+    cached = await asyncio.to_thread(_uml_cache_lookup, safe_description, uml_type)
+    if cached is not None:
+        print("[UML Agent] Response cache hit, skipping LLM call")
+        return cached
+
+    # Retrieve grounding context (best effort)
+    try:
+        rag_context = await asyncio.wait_for(retrieve_uml_context(safe_description), UML_RAG_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Context is optional; the worker thread still finishes and warms the embedding cache
+        print(f"[UML Agent] RAG context not ready within {UML_RAG_TIMEOUT}s, continuing without it")
+        rag_context = ""
+
+    # Build LLM prompt asking for multiple diagrams and architecture summary
+    prompt = (
+        f"{_PROMPT_HEAD}\n\nUser Description:\n{safe_description}\n\n"
+        f"Requested UML type: {uml_type}\n\n"
+        f"Use the provided UML best-practices and examples for grounding:\n{rag_context}\n\n"
+        f"{_PROMPT_SCHEMA}\n\n{_PROMPT_RULES}"
+    )
 
-    raw = await _call_groq(prompt, model="llama-3.3-70b-versatile", max_tokens=1600, temperature=0.15)
+    raw = await _stream_uml_reply(prompt)
 
-    cleaned = raw.strip()[:MAX_RAW_LEN]
-    if cleaned.startswith("```"):
-        lines = cleaned.split("\n")
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        cleaned = "\n".join(lines).strip()
+    cleaned = _strip_fences(raw.strip()[:MAX_RAW_LEN])
 
     # Try to parse JSON; if parsing fails, attempt a repair call; otherwise provide minimal fallback
     def _fallback_payload():
@@ -159,48 +387,90 @@ Begin.
             }
         }
 
-    def _coerce_and_bound(data: dict) -> dict:
-        try:
-            validated = UMLResponseModel(**data)
-        except ValidationError:
+    # Only responses that actually came from the model are cached, never the fallback payload.
+    # The client answers missing keys and API errors with its mock JSON, which would otherwise
+    # validate as an empty response.
+    from_llm = not is_mock_response(raw)
+
+    def _coerce_and_bound(data: dict, known_invalid: bool = False) -> dict:
+        nonlocal from_llm
+        validated = None
+        if not known_invalid:
+            try:
+                validated = UMLResponseModel.model_validate(data)
+            except ValidationError:
+                pass
+        if validated is None:
             # Attempt best-effort clipping then retry
             data = data or {}
-            data.setdefault("diagrams", [])
-            data["diagrams"] = data["diagrams"][:MAX_DIAGRAMS]
-            for d in data["diagrams"]:
-                if isinstance(d, dict):
-                    d["title"] = str(d.get("title", ""))[:MAX_TEXT_LEN]
-                    d["description"] = str(d.get("description", ""))[:MAX_TEXT_LEN]
-                    d["mermaid"] = str(d.get("mermaid", ""))[:MAX_MERMAID_LEN]
+            data["diagrams"] = [
+                {
+                    "type": d.get("type", ""),
+                    "title": str(d.get("title", ""))[_TEXT_CLIP],
+                    "mermaid": str(d.get("mermaid", ""))[_MERMAID_CLIP],
+                    "description": str(d.get("description", ""))[_TEXT_CLIP],
+                }
+                for d in data.get("diagrams", [])[:MAX_DIAGRAMS]
+                if isinstance(d, dict)
+            ]
             data.setdefault("apiRoutes", [])
             data.setdefault("folderStructure", "")
             data.setdefault("summary", {})
             data["folderStructure"] = str(data["folderStructure"])[:1000]
             try:
-                validated = UMLResponseModel(**data)
+                validated = UMLResponseModel.model_validate(data)
             except ValidationError:
-                validated = UMLResponseModel(**_fallback_payload())
-        # Convert back to primitive dict
-        return json.loads(validated.model_dump_json())
+                from_llm = False
+                validated = UMLResponseModel.model_validate(_fallback_payload())
+        # Convert back to primitive dict; mode="json" keeps the JSON-path coercions without
+        # serializing to a string and parsing it back
+        return validated.model_dump(mode="json")
 
-    try:
-        parsed = json.loads(cleaned)
-    except json.JSONDecodeError:
-        repair_prompt = (
-            "The previous response was not valid JSON. Reformat it strictly as JSON matching the schema. "
-            "Return only JSON, no markdown."
-            f" Previous response:\n{cleaned}"
-        )
-        repaired = await _call_groq(repair_prompt, model="llama-3.3-70b-versatile", max_tokens=800, temperature=0.0)
-        repaired_clean = repaired.strip()[:MAX_RAW_LEN]
-        if repaired_clean.startswith("```"):
-            lines = repaired_clean.split("\n")
-            lines = [l for l in lines if not l.strip().startswith("```")]
-            repaired_clean = "\n".join(lines).strip()
+    def _salvage(text: str):
+        # Prose around the object is the common failure; retry on the outermost {...} span
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            return None
         try:
-            parsed = json.loads(repaired_clean)
-        except Exception:
-            parsed = _fallback_payload()
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
 
-    bounded = _coerce_and_bound(parsed)
-    return bounded
\ No newline at end of file
+    async def _repair_and_validate(text: str) -> dict:
+        # Reached only when text failed model_validate_json: it is invalid JSON or off-schema
+        nonlocal from_llm
+        # Set when text parses as JSON: that document already failed the schema check
+        known_invalid = False
+        try:
+            parsed = json.loads(text)
+            known_invalid = True
+        except json.JSONDecodeError:
+            # Local salvage is cheap and usually enough; the repair round trip is the last resort
+            parsed = _salvage(text)
+            if parsed is None:
+                repair_prompt = (
+                    "The previous response was not valid JSON. Reformat it strictly as JSON matching the schema. "
+                    "Return only JSON, no markdown."
+                    f" Previous response:\n{text}"
+                )
+                repaired = await _call_groq(
+                    repair_prompt, model="llama-3.3-70b-versatile", max_tokens=800, temperature=0.0
+                )
+                if is_mock_response(repaired):
+                    from_llm = False
+                repaired_clean = _strip_fences(repaired.strip()[:MAX_RAW_LEN])
+                try:
+                    parsed = json.loads(repaired_clean)
+                except Exception:
+                    from_llm = False
+                    parsed = _fallback_payload()
+        return _coerce_and_bound(parsed, known_invalid)
+
+    # Happy path: parse and validate in one pass straight from the raw text
+    try:
+        bounded = UMLResponseModel.model_validate_json(cleaned).model_dump(mode="json")
+    except ValidationError:
+        bounded = await _repair_and_validate(cleaned)
+    if from_llm and bounded["diagrams"]:
+        await asyncio.to_thread(_uml_cache_store, safe_description, uml_type, bounded)
+    return bounded
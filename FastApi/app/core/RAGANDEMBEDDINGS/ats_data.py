@@ -23,4 +23,8 @@ ats_data = [
         "id": "formatting",
         "text": "Prefer PDF over DOCX for stability; ensure text is selectable; avoid images of text and complex multi-column layouts."
     },
-]
\ No newline at end of file
+]
+
+# Parallel id/text views, built once at import for seeding and flat-index builds
+ATS_IDS: tuple[str, ...] = tuple(x["id"] for x in ats_data)
+ATS_TEXTS: tuple[str, ...] = tuple(x["text"] for x in ats_data)
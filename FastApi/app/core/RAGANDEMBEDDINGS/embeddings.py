@@ -1,6 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from contextlib import closing
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# EMBED_BACKEND=onnx loads the INT8-quantized ONNX export of MiniLM (needs sentence-transformers[onnx]).
+# The default file targets AVX512-VNNI CPUs; override EMBED_ONNX_FILE for other hardware.
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+EMBED_ENCODE_BATCH = 64 if EMBED_BACKEND == "onnx" else 32
+
+def _load_model():
+    if EMBED_BACKEND != "onnx":
+        return SentenceTransformer(EMBED_MODEL_NAME, device="cpu")
+
+    import onnxruntime as ort
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    return SentenceTransformer(
+        EMBED_MODEL_NAME,
+        backend="onnx",
+        model_kwargs={
+            "file_name": EMBED_ONNX_FILE,
+            "provider": "CPUExecutionProvider",
+            "session_options": sess_options,
+        },
+    )
+
+model = _load_model()
+
+# Micro-batching: concurrent embed_async() calls arriving within the window share one encode()
+EMBED_BATCH_WINDOW = 0.005  # seconds
+EMBED_MAX_BATCH = 32
+
+# Query embeddings keyed by whitespace-normalized text (tokenizer ignores whitespace runs)
+QUERY_CACHE_MAXSIZE = 2048
+_query_cache = OrderedDict()
+
+_queue = None
+_worker = None
+_loop = None
+
+def embed_matrix(texts):
+    """Embed a list of texts into an (N, dim) float32 ndarray, skipping the list conversion."""
+    # Unit-normalized so cosine similarity reduces to a dot product
+    return model.encode(
+        texts, batch_size=EMBED_ENCODE_BATCH, convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float32, copy=False)
 
 def embed(texts):
-    return model.encode(texts).tolist()
\ No newline at end of file
+    return embed_matrix(texts).tolist()
+
+# Per-text embedding cache shared by every knowledge base: sha256(backend|model|text) -> float32 row.
+# Texts repeated across KBs embed once, and an edited corpus only re-embeds the changed entries.
+EMBED_CACHE_PATH = os.path.join("data", "rag_cache.db")
+EMBED_CACHE_QUERY_CHUNK = 500  # stay under SQLite's bound-parameter limit
+
+def _text_key(text):
+    return hashlib.sha256(f"{EMBED_BACKEND}|{EMBED_MODEL_NAME}|{text}".encode("utf-8")).hexdigest()
+
+def embed_matrix_cached(texts):
+    """embed_matrix() backed by the on-disk per-text cache; only cache misses hit the model."""
+    if not texts:
+        return embed_matrix(texts)
+    keys = [_text_key(t) for t in texts]
+    try:
+        os.makedirs(os.path.dirname(EMBED_CACHE_PATH), exist_ok=True)
+        with closing(sqlite3.connect(EMBED_CACHE_PATH)) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+            rows = {}
+            for start in range(0, len(keys), EMBED_CACHE_QUERY_CHUNK):
+                chunk = keys[start:start + EMBED_CACHE_QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(conn.execute(f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})", chunk))
+
+            missing = {k: t for k, t in zip(keys, texts) if k not in rows}
+            if missing:
+                fresh = embed_matrix(list(missing.values()))
+                new_rows = [(k, vec.tobytes()) for k, vec in zip(missing, fresh)]
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", new_rows)
+                conn.commit()
+                rows.update(new_rows)
+    except sqlite3.Error as e:
+        print(f"Embedding cache unavailable, embedding directly: {e}")
+        return embed_matrix(texts)
+    return np.stack([np.frombuffer(rows[k], dtype=np.float32) for k in keys])
+
+# Seed knowledge embeddings are persisted as data/<name>_emb_<digest>.npy next to rag_cache.db.
+# The digest covers the encoder (backend|model) and the corpus, so a new model or an edited
+# corpus gets a new file rather than reusing vectors from another encoder.
+SEED_EMB_DIR = os.path.dirname(EMBED_CACHE_PATH)
+
+def load_seed_embeddings(name, items, texts=None):
+    """Return the (N, dim) embedding matrix for a seed knowledge list, memory-mapped when current.
+
+    texts: optional precomputed item texts (e.g. UML_TEXTS); derived from items when omitted.
+    """
+    corpus = json.dumps(items, sort_keys=True)
+    digest = hashlib.sha256(f"{EMBED_BACKEND}|{EMBED_MODEL_NAME}|{corpus}".encode("utf-8")).hexdigest()
+    path = os.path.join(SEED_EMB_DIR, f"{name}_emb_{digest[:16]}.npy")
+    try:
+        emb = np.load(path, mmap_mode="r")
+        if emb.shape[0] == len(items):
+            return emb
+    except (OSError, ValueError):
+        pass
+
+    if texts is None:
+        texts = [x["text"] for x in items]
+    emb = embed_matrix_cached(list(texts))
+    # Write to a temp file and rename: readers in other workers never see a partial array
+    tmp_path = None
+    try:
+        os.makedirs(SEED_EMB_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SEED_EMB_DIR, prefix=f".{name}_emb_", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, emb)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not persist {name} seed embeddings: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return emb
+
+def embed_one(text):
+    """Embed a single string into a (dim,) float32 ndarray (no batch-of-one wrapping)."""
+    return model.encode(text, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32, copy=False)
+
+async def _batch_worker(queue):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < EMBED_MAX_BATCH:
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=EMBED_BATCH_WINDOW))
+            except asyncio.TimeoutError:
+                break
+
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await loop.run_in_executor(None, embed, texts)
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            continue
+
+        for (_, fut), vec in zip(batch, vectors):
+            if not fut.done():
+                fut.set_result(vec)
+
+def _normalize_query(text):
+    return " ".join(text.split())
+
+async def embed_async(text):
+    """Embed a single text off the event loop, coalescing with concurrent callers.
+
+    Results are LRU-cached, so repeat queries (e.g. re-analysing the same repo) skip the model.
+    """
+    global _queue, _worker, _loop
+    key = _normalize_query(text)
+    cached = _query_cache.get(key)
+    if cached is not None:
+        _query_cache.move_to_end(key)
+        return list(cached)
+
+    loop = asyncio.get_running_loop()
+    if _loop is not loop or _worker is None or _worker.done():
+        _loop = loop
+        _queue = asyncio.Queue()
+        _worker = loop.create_task(_batch_worker(_queue))
+
+    fut = loop.create_future()
+    await _queue.put((key, fut))
+    vec = await fut
+
+    _query_cache[key] = tuple(vec)
+    if len(_query_cache) > QUERY_CACHE_MAXSIZE:
+        _query_cache.popitem(last=False)
+    return vec
@@ -0,0 +1,48 @@
+"""In-memory flat inner-product index over a seed knowledge list.
+
+Used where a corpus is small and static enough that a Chroma/HNSW round trip costs more than
+scanning every row. Rows are L2-normalized, so the inner product is the cosine similarity.
+Chroma only stores float32 vectors, so int8 storage is only possible in this in-process index.
+"""
+
+import numpy as np
+
+from app.core.RAGANDEMBEDDINGS.embeddings import load_seed_embeddings
+
+
+def quantize_int8(matrix):
+    """Symmetric per-row int8 quantization; returns (int8 matrix, float32 row scales)."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def build_flat_index(name, items, int8=False, ids=None, texts=None):
+    """Return (matrix, scales, ids, texts) for items; scales is None unless int8 is set.
+
+    ids/texts may be passed as precomputed tuples; otherwise they are derived from items.
+    """
+    if ids is None:
+        ids = tuple(x["id"] for x in items)
+    if texts is None:
+        texts = tuple(x["text"] for x in items)
+    matrix = np.array(load_seed_embeddings(name, items, texts), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    scales = None
+    if int8:
+        matrix, scales = quantize_int8(matrix)
+    return matrix, scales, ids, texts
+
+
+def topk_ip(matrix, q, k, scales=None):
+    """Indices of the k rows with the highest inner product with q, best first."""
+    scores = matrix @ q
+    if scales is not None:
+        scores = scores * scales
+    k = min(k, scores.shape[0])
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
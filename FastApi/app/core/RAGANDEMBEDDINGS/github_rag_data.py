@@ -19,4 +19,8 @@ github_knowledge = [
         "id": "code-smells",
         "text": "Flag long functions, duplicate logic, global state, and unclear naming; add docstrings and type hints for public interfaces."
     }
-]
\ No newline at end of file
+]
+
+# Parallel id/text views, built once at import for seeding and flat-index builds
+GITHUB_IDS: tuple[str, ...] = tuple(x["id"] for x in github_knowledge)
+GITHUB_TEXTS: tuple[str, ...] = tuple(x["text"] for x in github_knowledge)
@@ -27,4 +27,8 @@ learning_knowledge = [
         "id": "timeline_estimation",
         "text": "Beginner: 12-18 weeks, Intermediate: 8-12 weeks, Advanced: 6-8 weeks. Factor in 1.5x for working professionals, 1x for students, 0.7x for full-time learners."
     },
-]
\ No newline at end of file
+]
+
+# Parallel id/text views, built once at import for seeding and flat-index builds
+LEARNING_IDS: tuple[str, ...] = tuple(x["id"] for x in learning_knowledge)
+LEARNING_TEXTS: tuple[str, ...] = tuple(x["text"] for x in learning_knowledge)
@@ -0,0 +1,35 @@
+"""Shared seeding for the Chroma-backed knowledge bases.
+
+Every *_rag_data.py list has the same [{"id", "text"}, ...] shape, so the agents seed through
+seed_kb() instead of each embedding its corpus separately. Vectors come from the persisted
+data/<name>_emb_<digest>.npy when it is current, otherwise from the per-text embedding cache.
+"""
+
+from app.core.RAGANDEMBEDDINGS.embeddings import load_seed_embeddings
+from app.core.RAGANDEMBEDDINGS.vectorstore import get_or_create_collection
+
+SEED_BATCH_SIZE = 128
+
+
+def seed_kb(collection_name, items, metadata=None, ids=None, texts=None):
+    """Return the named collection, filling it from items if it is empty.
+
+    ids/texts: optional precomputed parallel tuples (e.g. UML_IDS/UML_TEXTS) so seeding does
+    not rebuild them from items; derived from items when omitted.
+    """
+    col = get_or_create_collection(collection_name, metadata=metadata)
+    if col.count() == 0:
+        if ids is None:
+            ids = tuple(x["id"] for x in items)
+        if texts is None:
+            texts = tuple(x["text"] for x in items)
+        emb = load_seed_embeddings(collection_name, items, texts)
+        # Insert in bounded chunks; Chroma add throughput drops off past a few hundred rows
+        for start in range(0, len(ids), SEED_BATCH_SIZE):
+            end = start + SEED_BATCH_SIZE
+            col.add(
+                documents=list(texts[start:end]),
+                ids=list(ids[start:end]),
+                embeddings=emb[start:end].tolist(),
+            )
+    return col
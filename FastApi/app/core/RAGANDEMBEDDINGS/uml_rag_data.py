@@ -19,4 +19,8 @@ uml_knowledge = [
         "id": "uml_flowchart",
         "text": "Flowcharts represent process flows using decisions, actions, branching, looping, and termination nodes."
     }
-]
\ No newline at end of file
+]
+
+# Parallel id/text views, built once at import for seeding and flat-index builds
+UML_IDS: tuple[str, ...] = tuple(x["id"] for x in uml_knowledge)
+UML_TEXTS: tuple[str, ...] = tuple(x["text"] for x in uml_knowledge)
@@ -7,6 +7,10 @@ DB_PATH = os.path.join("data", "chroma")
 os.makedirs(DB_PATH, exist_ok=True)
 chroma_client = chromadb.PersistentClient(path=DB_PATH)
 
-def get_or_create_collection(name: str = "portfolio_knowledge"):
+def get_or_create_collection(name: str = "portfolio_knowledge", metadata: dict | None = None):
     # Metadata like hnsw:space may be ignored depending on backend; kept for compatibility.
-    return chroma_client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
\ No newline at end of file
+    # Extra metadata (e.g. hnsw:M / hnsw:construction_ef) only applies when the collection is created.
+    # Vectors are always precomputed by embeddings.embed(), so skip Chroma's default ONNX embedder.
+    return chroma_client.get_or_create_collection(
+        name=name, metadata={"hnsw:space": "cosine", **(metadata or {})}, embedding_function=None
+    )
\ No newline at end of file
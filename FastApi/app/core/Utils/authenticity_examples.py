@@ -4,7 +4,8 @@ Example: How to use the Experience Authenticity & Skill Consistency Agent
 This demonstrates the agent with sample data and shows expected outputs.
 """
 
-import json
+import orjson
+
 from app.models.authenticity import (
     ResumeData,
     GitHubEvidence,
@@ -12,6 +13,11 @@ from app.models.authenticity import (
     AuthenticityAnalysisInput,
 )
 
+
+def _dumps_pretty(obj):
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+
 # ==================== EXAMPLE 1: Strong Evidence Candidate ====================
 
 def create_example_strong_candidate():
@@ -310,16 +316,16 @@ if __name__ == "__main__":
     print("EXAMPLE 1: Strong Evidence Candidate")
     print("=" * 80)
     example1 = create_example_strong_candidate()
-    print(json.dumps(example1.model_dump(), indent=2))
+    print(_dumps_pretty(example1.model_dump()))
     
     print("\n" + "=" * 80)
     print("EXAMPLE 2: Partial Evidence Candidate")
     print("=" * 80)
     example2 = create_example_partial_candidate()
-    print(json.dumps(example2.model_dump(), indent=2))
+    print(_dumps_pretty(example2.model_dump()))
     
     print("\n" + "=" * 80)
     print("EXAMPLE 3: No GitHub Candidate")
     print("=" * 80)
     example3 = create_example_no_github_candidate()
-    print(json.dumps(example3.model_dump(), indent=2))
+    print(_dumps_pretty(example3.model_dump()))
@@ -4,9 +4,63 @@ This module provides various metrics to evaluate the quality of predictions
 from ATS and GitHub analysis agents against expected outputs.
 """
 
+import functools
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+try:  # optional SIMD kernels for cosine distance; numpy is used when absent
+    import simsimd
+    _HAS_SIMSIMD = True
+except ImportError:
+    simsimd = None
+    _HAS_SIMSIMD = False
+
+try:  # optional Aho-Corasick automaton (pyahocorasick) for multi-keyword substring search
+    import ahocorasick
+    _HAS_AHOCORASICK = True
+except ImportError:
+    ahocorasick = None
+    _HAS_AHOCORASICK = False
+
+# Embeddings keyed by (embedding_func, text): expected texts repeat across test cases and runs.
+# Keying on the function object itself (not id()) keeps it alive, so keys cannot be recycled.
+EMBED_CACHE_MAXSIZE = 2048
+_embed_cache: "OrderedDict[Tuple[Any, str], np.ndarray]" = OrderedDict()
+_embed_cache_lock = threading.Lock()
+
+
+def _embed_cached(texts: List[str], embedding_func: callable) -> np.ndarray:
+    """Return a (len(texts), dim) float32 matrix, embedding only texts not already cached.
+
+    Cache misses, deduplicated, go to embedding_func in a single call.
+    """
+    try:
+        hash(embedding_func)
+    except TypeError:
+        return np.array(embedding_func(list(texts)), dtype=np.float32)
+
+    rows = {}
+    with _embed_cache_lock:
+        for text in texts:
+            row = _embed_cache.get((embedding_func, text))
+            if row is not None:
+                _embed_cache.move_to_end((embedding_func, text))
+                rows[text] = row
+
+    missing = list(dict.fromkeys(text for text in texts if text not in rows))
+    if missing:
+        new_rows = np.array(embedding_func(missing), dtype=np.float32).reshape(len(missing), -1)
+        new_rows.setflags(write=False)  # cached rows are shared between calls
+        with _embed_cache_lock:
+            for text, row in zip(missing, new_rows):
+                _embed_cache[(embedding_func, text)] = row
+                rows[text] = row
+            while len(_embed_cache) > EMBED_CACHE_MAXSIZE:
+                _embed_cache.popitem(last=False)
+
+    return np.stack([rows[text] for text in texts])
 
 
 def score_accuracy(
@@ -68,11 +122,12 @@ def keyword_overlap(
         pred_set = {item.strip() for item in predicted_list}
         exp_set = {item.strip() for item in expected_list}
     
-    # Calculate Jaccard similarity
+    # Calculate Jaccard similarity; set & already iterates the smaller operand, and the
+    # union size follows from the other sizes without building the union set
     intersection = pred_set & exp_set
-    union = pred_set | exp_set
+    union_size = len(pred_set) + len(exp_set) - len(intersection)
     
-    jaccard_score = len(intersection) / len(union) if union else 0.0
+    jaccard_score = len(intersection) / union_size if union_size else 0.0
     
     # Identify differences
     matched = list(intersection)
@@ -89,6 +144,29 @@ def keyword_overlap(
     }
 
 
+@functools.lru_cache(maxsize=256)
+def _keyword_automaton(patterns: Tuple[str, ...]):
+    """Build the automaton for a keyword tuple once; eval suites reuse the same expectations."""
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+    return automaton
+
+
+def _found_substrings(text: str, patterns: List[str]) -> set:
+    """Return the patterns that occur in text, in one pass over text when possible."""
+    # The automaton cannot hold empty patterns; "" is a substring of any text anyway
+    non_empty = tuple(sorted({p for p in patterns if p}))
+    if _HAS_AHOCORASICK and non_empty:
+        found = {value for _, value in _keyword_automaton(non_empty).iter(text)}
+    else:
+        found = {p for p in non_empty if p in text}
+    if "" in patterns:
+        found.add("")
+    return found
+
+
 def substring_match(
     predicted_list: List[str],
     expected_list: List[str],
@@ -112,14 +190,9 @@ def substring_match(
         predicted_str = predicted_str.lower()
         expected_list = [item.lower() for item in expected_list]
     
-    matched = []
-    missing = []
-    
-    for expected_item in expected_list:
-        if expected_item in predicted_str:
-            matched.append(expected_item)
-        else:
-            missing.append(expected_item)
+    found = _found_substrings(predicted_str, expected_list)
+    matched = [item for item in expected_list if item in found]
+    missing = [item for item in expected_list if item not in found]
     
     match_rate = len(matched) / len(expected_list) if expected_list else 0.0
     
@@ -149,14 +222,16 @@ def semantic_similarity(
     if embedding_func:
         # Use provided embedding function
         try:
-            pred_emb = embedding_func([predicted_text])[0]
-            exp_emb = embedding_func([expected_text])[0]
+            pred_emb, exp_emb = _embed_cached([predicted_text, expected_text], embedding_func)
             
-            # Reshape for cosine_similarity
-            pred_emb = np.array(pred_emb).reshape(1, -1)
-            exp_emb = np.array(exp_emb).reshape(1, -1)
-            
-            similarity = float(cosine_similarity(pred_emb, exp_emb)[0][0])
+            # Scalar cosine on 1-D vectors; a zero vector scores 0.0, as sklearn's did
+            if not pred_emb.any() or not exp_emb.any():
+                similarity = 0.0
+            elif _HAS_SIMSIMD:
+                similarity = 1.0 - float(simsimd.cosine(pred_emb, exp_emb))
+            else:
+                denom = np.sqrt(np.vdot(pred_emb, pred_emb) * np.vdot(exp_emb, exp_emb))
+                similarity = float(np.dot(pred_emb, exp_emb) / denom)
             
             return {
                 "similarity_score": similarity,
@@ -184,6 +259,85 @@ def semantic_similarity(
     }
 
 
+def _quantize_rows_int8(embs: np.ndarray) -> np.ndarray:
+    """Scale each row to the int8 range; per-row scales cancel out of the cosine."""
+    max_abs = np.max(np.abs(embs), axis=1, keepdims=True)
+    scale = 127.0 / np.where(max_abs == 0, 1.0, max_abs)
+    return np.clip(np.round(embs * scale), -127, 127).astype(np.int8)
+
+
+def semantic_similarity_batch(
+    predicted_texts: List[str],
+    expected_texts: List[str],
+    embedding_func: Optional[callable] = None,
+    quantize: bool = False
+) -> Dict[str, Any]:
+    """Calculate pairwise semantic similarity for aligned lists of texts.
+
+    Embeds all uncached texts in a single embedding_func call and scores every
+    (predicted_texts[i], expected_texts[i]) pair with one row-wise dot product,
+    instead of two embedding calls per pair through semantic_similarity.
+
+    Args:
+        predicted_texts: Predicted texts
+        expected_texts: Expected texts, aligned with predicted_texts
+        embedding_func: Function to generate embeddings (defaults to simple word overlap)
+        quantize: Score int8-quantized embeddings (quarter the memory traffic, small
+            accuracy loss); only faster when simsimd's int8 kernels are available
+
+    Returns:
+        Dictionary with 'similarity_scores' (one per pair) and 'method'
+    """
+    if len(predicted_texts) != len(expected_texts):
+        raise ValueError("predicted_texts and expected_texts must have the same length")
+
+    if not predicted_texts:
+        return {"similarity_scores": [], "method": "embedding_cosine" if embedding_func else "word_overlap"}
+
+    if embedding_func:
+        try:
+            # One embedding call covers every uncached text across both lists
+            embs = _embed_cached(list(predicted_texts) + list(expected_texts), embedding_func)
+            pred_embs, exp_embs = embs[:len(predicted_texts)], embs[len(predicted_texts):]
+            method = "embedding_cosine"
+
+            if quantize:
+                pred_embs = _quantize_rows_int8(pred_embs)
+                exp_embs = _quantize_rows_int8(exp_embs)
+                method = "embedding_cosine_int8"
+                if not _HAS_SIMSIMD:
+                    # No int8 kernel: score the quantized values with the float path below
+                    pred_embs = pred_embs.astype(np.float32)
+                    exp_embs = exp_embs.astype(np.float32)
+
+            if _HAS_SIMSIMD:
+                # Same-shape 2-D inputs give row-by-row distances, not the full N x N matrix
+                similarities = 1.0 - np.asarray(simsimd.cosine(pred_embs, exp_embs), dtype=np.float32)
+                similarities[~(pred_embs.any(axis=1) & exp_embs.any(axis=1))] = 0.0
+            else:
+                # Normalize rows once; zero rows stay zero and score 0.0
+                for embs in (pred_embs, exp_embs):
+                    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+                    embs /= np.where(norms == 0, 1.0, norms)
+                similarities = np.einsum("ij,ij->i", pred_embs, exp_embs)
+
+            return {
+                "similarity_scores": similarities.tolist(),
+                "method": method
+            }
+        except Exception as e:
+            # Fall back to simple method
+            pass
+
+    return {
+        "similarity_scores": [
+            semantic_similarity(pred, exp)["similarity_score"]
+            for pred, exp in zip(predicted_texts, expected_texts)
+        ],
+        "method": "word_overlap"
+    }
+
+
 def json_structure_validity(
     output: Dict[str, Any],
     required_fields: List[str],
@@ -277,6 +431,17 @@ def list_field_comparison(
         )
 
 
+# Score key per metric type, in the order aggregate_metrics looks for them
+_SCORE_KEYS = ("accuracy", "jaccard_score", "similarity_score", "match_rate")
+
+
+def _primary_score(result: Dict[str, Any]) -> Optional[float]:
+    for key in _SCORE_KEYS:
+        if key in result:
+            return result[key]
+    return None
+
+
 def aggregate_metrics(metric_results: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Aggregate multiple metric results into summary statistics.
     
@@ -298,19 +463,13 @@ def aggregate_metrics(metric_results: List[Dict[str, Any]]) -> Dict[str, Any]:
     passed = sum(1 for result in metric_results if result.get("passed", False))
     failed = total - passed
     
-    # Calculate average scores for various metrics
-    scores = []
-    for result in metric_results:
-        if "accuracy" in result:
-            scores.append(result["accuracy"])
-        elif "jaccard_score" in result:
-            scores.append(result["jaccard_score"])
-        elif "similarity_score" in result:
-            scores.append(result["similarity_score"])
-        elif "match_rate" in result:
-            scores.append(result["match_rate"])
-    
-    avg_score = sum(scores) / len(scores) if scores else 0.0
+    # Calculate average scores for various metrics; results without a score are skipped
+    scores = np.fromiter(
+        (score for score in map(_primary_score, metric_results) if score is not None),
+        dtype=np.float64
+    )
+    
+    avg_score = float(scores.mean()) if scores.size else 0.0
     
     return {
         "total_tests": total,
@@ -4,11 +4,202 @@ Generates comprehensive HTML and JSON reports from evaluation results,
 including metrics, visualizations, and trend tracking.
 """
 
-import json
+import html
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import statistics
+import string
+
+import orjson
+
+# numpy scalars can reach the report from the similarity metrics; non-str keys match json.dump.
+# Unlike json.dump, orjson writes NaN/Infinity (e.g. a zero-vector similarity) as null, so
+# readers go through _report_float to get NaN back.
+_JSON_REPORT_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _report_float(stats: Dict[str, Any], key: str, default: float = 0.0) -> float:
+    """Read a float statistic from a loaded report, mapping null (a non-finite value) to NaN."""
+    value = stats.get(key, default)
+    return float("nan") if value is None else value
+
+# Page templates built once at import; _generate_html only substitutes per-report values.
+# string.Template keeps the CSS braces literal and needs no template engine dependency.
+_REPORT_HEADER = string.Template("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Evaluation Report - ${agent}</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
+            background: #f5f5f5;
+            padding: 20px;
+            line-height: 1.6;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 30px;
+            border-radius: 8px 8px 0 0;
+        }
+        .header h1 { font-size: 2em; margin-bottom: 10px; }
+        .header p { opacity: 0.9; }
+        .status-badge {
+            display: inline-block;
+            padding: 8px 16px;
+            background: ${status_color};
+            color: white;
+            border-radius: 20px;
+            font-weight: bold;
+            margin-top: 15px;
+        }
+        .content { padding: 30px; }
+        .section {
+            margin-bottom: 30px;
+            padding: 20px;
+            background: #fafafa;
+            border-radius: 8px;
+        }
+        .section h2 {
+            font-size: 1.5em;
+            margin-bottom: 15px;
+            color: #333;
+        }
+        .stats-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 15px;
+            margin-top: 15px;
+        }
+        .stat-card {
+            background: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+        }
+        .stat-card h3 {
+            font-size: 0.9em;
+            color: #666;
+            margin-bottom: 10px;
+            text-transform: uppercase;
+        }
+        .stat-card .value {
+            font-size: 2em;
+            font-weight: bold;
+            color: #333;
+        }
+        .test-case {
+            background: white;
+            padding: 15px;
+            margin-bottom: 10px;
+            border-radius: 6px;
+            border-left: 4px solid #ddd;
+        }
+        .test-case.passed { border-left-color: #4CAF50; }
+        .test-case.failed { border-left-color: #F44336; }
+        .test-case.skipped { border-left-color: #FF9800; }
+        .test-case h3 { font-size: 1.1em; margin-bottom: 5px; }
+        .test-case p { color: #666; font-size: 0.9em; }
+        .metrics {
+            display: flex;
+            gap: 15px;
+            margin-top: 10px;
+            flex-wrap: wrap;
+        }
+        .metric {
+            background: #f0f0f0;
+            padding: 5px 10px;
+            border-radius: 4px;
+            font-size: 0.85em;
+        }
+        .failure {
+            background: #ffebee;
+            padding: 15px;
+            margin-bottom: 10px;
+            border-radius: 6px;
+            border-left: 4px solid #F44336;
+        }
+        .failure h3 { color: #c62828; margin-bottom: 8px; }
+        .failure .error { 
+            background: white;
+            padding: 10px;
+            border-radius: 4px;
+            margin-top: 10px;
+            font-family: monospace;
+            font-size: 0.9em;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>${status_icon} Evaluation Report</h1>
+            <p><strong>Agent:</strong> ${agent}</p>
+            <p><strong>Timestamp:</strong> ${timestamp}</p>
+            <div class="status-badge">
+                Pass Rate: ${pass_rate}
+            </div>
+        </div>
+        
+        <div class="content">
+            <div class="section">
+                <h2>📊 Summary</h2>
+                <p>${summary}</p>
+            </div>
+            
+            <div class="section">
+                <h2>📈 Statistics</h2>
+                <div class="stats-grid">
+                    <div class="stat-card">
+                        <h3>Total Tests</h3>
+                        <div class="value">${total_tests}</div>
+                    </div>
+                    <div class="stat-card">
+                        <h3>Passed</h3>
+                        <div class="value" style="color: #4CAF50;">${passed}</div>
+                    </div>
+                    <div class="stat-card">
+                        <h3>Failed</h3>
+                        <div class="value" style="color: #F44336;">${failed}</div>
+                    </div>
+                    <div class="stat-card">
+                        <h3>Avg Score Accuracy</h3>
+                        <div class="value">${avg_score_accuracy}</div>
+                    </div>
+                    <div class="stat-card">
+                        <h3>Avg Duration</h3>
+                        <div class="value">${avg_duration_ms}ms</div>
+                    </div>
+                </div>
+            </div>
+""")
+
+_TEST_CASE_OPEN = string.Template("""
+                <div class="test-case ${outcome}">
+                    <h3>${name}</h3>
+                    <p>${description}</p>
+                    <p><strong>Duration:</strong> ${duration_ms}ms</p>
+""")
+
+_FAILURE = string.Template("""
+                <div class="failure">
+                    <h3>${name}</h3>
+                    <p>${description}</p>
+                    <div class="error">${error}</div>
+                </div>
+""")
 
 
 class EvalReporter:
@@ -232,9 +423,8 @@ class EvalReporter:
         filename = f"eval_{agent_name}_{clean_timestamp}.json"
         filepath = self.results_dir / filename
         
-        # Save
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        # Save; orjson emits UTF-8 bytes directly, like json.dump with ensure_ascii=False
+        filepath.write_bytes(orjson.dumps(report, option=_JSON_REPORT_OPTIONS))
         
         return filepath
     
@@ -273,225 +463,77 @@ class EvalReporter:
             status_color = "#F44336"
             status_icon = "❌"
         
-        html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Evaluation Report - {report['agent']}</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            background: #f5f5f5;
-            padding: 20px;
-            line-height: 1.6;
-        }}
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 8px 8px 0 0;
-        }}
-        .header h1 {{ font-size: 2em; margin-bottom: 10px; }}
-        .header p {{ opacity: 0.9; }}
-        .status-badge {{
-            display: inline-block;
-            padding: 8px 16px;
-            background: {status_color};
-            color: white;
-            border-radius: 20px;
-            font-weight: bold;
-            margin-top: 15px;
-        }}
-        .content {{ padding: 30px; }}
-        .section {{
-            margin-bottom: 30px;
-            padding: 20px;
-            background: #fafafa;
-            border-radius: 8px;
-        }}
-        .section h2 {{
-            font-size: 1.5em;
-            margin-bottom: 15px;
-            color: #333;
-        }}
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-top: 15px;
-        }}
-        .stat-card {{
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }}
-        .stat-card h3 {{
-            font-size: 0.9em;
-            color: #666;
-            margin-bottom: 10px;
-            text-transform: uppercase;
-        }}
-        .stat-card .value {{
-            font-size: 2em;
-            font-weight: bold;
-            color: #333;
-        }}
-        .test-case {{
-            background: white;
-            padding: 15px;
-            margin-bottom: 10px;
-            border-radius: 6px;
-            border-left: 4px solid #ddd;
-        }}
-        .test-case.passed {{ border-left-color: #4CAF50; }}
-        .test-case.failed {{ border-left-color: #F44336; }}
-        .test-case.skipped {{ border-left-color: #FF9800; }}
-        .test-case h3 {{ font-size: 1.1em; margin-bottom: 5px; }}
-        .test-case p {{ color: #666; font-size: 0.9em; }}
-        .metrics {{
-            display: flex;
-            gap: 15px;
-            margin-top: 10px;
-            flex-wrap: wrap;
-        }}
-        .metric {{
-            background: #f0f0f0;
-            padding: 5px 10px;
-            border-radius: 4px;
-            font-size: 0.85em;
-        }}
-        .failure {{
-            background: #ffebee;
-            padding: 15px;
-            margin-bottom: 10px;
-            border-radius: 6px;
-            border-left: 4px solid #F44336;
-        }}
-        .failure h3 {{ color: #c62828; margin-bottom: 8px; }}
-        .failure .error {{ 
-            background: white;
-            padding: 10px;
-            border-radius: 4px;
-            margin-top: 10px;
-            font-family: monospace;
-            font-size: 0.9em;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>{status_icon} Evaluation Report</h1>
-            <p><strong>Agent:</strong> {report['agent']}</p>
-            <p><strong>Timestamp:</strong> {report['timestamp']}</p>
-            <div class="status-badge">
-                Pass Rate: {stats['pass_rate']:.1%}
-            </div>
-        </div>
-        
-        <div class="content">
-            <div class="section">
-                <h2>📊 Summary</h2>
-                <p>{summary}</p>
-            </div>
-            
-            <div class="section">
-                <h2>📈 Statistics</h2>
-                <div class="stats-grid">
-                    <div class="stat-card">
-                        <h3>Total Tests</h3>
-                        <div class="value">{stats['total_tests']}</div>
-                    </div>
-                    <div class="stat-card">
-                        <h3>Passed</h3>
-                        <div class="value" style="color: #4CAF50;">{stats['passed']}</div>
-                    </div>
-                    <div class="stat-card">
-                        <h3>Failed</h3>
-                        <div class="value" style="color: #F44336;">{stats['failed']}</div>
-                    </div>
-                    <div class="stat-card">
-                        <h3>Avg Score Accuracy</h3>
-                        <div class="value">{stats.get('average_score_accuracy', 0):.1%}</div>
-                    </div>
-                    <div class="stat-card">
-                        <h3>Avg Duration</h3>
-                        <div class="value">{performance['avg_duration_ms']:.0f}ms</div>
-                    </div>
-                </div>
-            </div>
-"""
+        # Collect fragments and join once; repeated += copies the whole page per test case
+        parts = [_REPORT_HEADER.substitute(
+            agent=html.escape(str(report['agent'])),
+            timestamp=html.escape(str(report['timestamp'])),
+            summary=html.escape(summary),
+            status_color=status_color,
+            status_icon=status_icon,
+            pass_rate=f"{stats['pass_rate']:.1%}",
+            total_tests=stats['total_tests'],
+            passed=stats['passed'],
+            failed=stats['failed'],
+            avg_score_accuracy=f"{stats.get('average_score_accuracy', 0):.1%}",
+            avg_duration_ms=f"{performance['avg_duration_ms']:.0f}",
+        )]
         
         # Add test cases
         if test_cases:
-            html += """
+            parts.append("""
             <div class="section">
                 <h2>🧪 Test Cases</h2>
-"""
+""")
             for tc in test_cases:
-                outcome = tc.get("outcome", "unknown")
-                name = tc.get("name", "Unknown")
-                description = tc.get("description", "")
+                outcome = html.escape(str(tc.get("outcome", "unknown")))
+                name = html.escape(str(tc.get("name", "Unknown")))
+                description = html.escape(str(tc.get("description", "")))
                 duration = tc.get("duration_ms", 0)
                 
-                html += f"""
-                <div class="test-case {outcome}">
-                    <h3>{name}</h3>
-                    <p>{description}</p>
-                    <p><strong>Duration:</strong> {duration:.0f}ms</p>
-"""
+                parts.append(_TEST_CASE_OPEN.substitute(
+                    outcome=outcome, name=name, description=description, duration_ms=f"{duration:.0f}"
+                ))
                 
                 if "metrics" in tc:
-                    html += '<div class="metrics">'
-                    for metric_name, metric_value in tc["metrics"].items():
-                        if isinstance(metric_value, float):
-                            html += f'<div class="metric"><strong>{metric_name}:</strong> {metric_value:.1%}</div>'
-                    html += '</div>'
+                    parts.append('<div class="metrics">')
+                    parts.extend(
+                        f'<div class="metric"><strong>{html.escape(str(metric_name))}:</strong> {metric_value:.1%}</div>'
+                        for metric_name, metric_value in tc["metrics"].items()
+                        if isinstance(metric_value, float)
+                    )
+                    parts.append('</div>')
                 
-                html += """
+                parts.append("""
                 </div>
-"""
-            html += """
+""")
+            parts.append("""
             </div>
-"""
+""")
         
         # Add failures section
         if failures:
-            html += """
+            parts.append("""
             <div class="section">
                 <h2>❌ Failures</h2>
-"""
+""")
             for failure in failures:
-                html += f"""
-                <div class="failure">
-                    <h3>{failure['name']}</h3>
-                    <p>{failure['description']}</p>
-                    <div class="error">{failure.get('error', 'Unknown error')}</div>
-                </div>
-"""
-            html += """
+                parts.append(_FAILURE.substitute(
+                    name=html.escape(str(failure['name'])),
+                    description=html.escape(str(failure['description'])),
+                    error=html.escape(str(failure.get('error', 'Unknown error'))),
+                ))
+            parts.append("""
             </div>
-"""
+""")
         
-        html += """
+        parts.append("""
         </div>
     </div>
 </body>
 </html>
-"""
+""")
         
-        return html
+        return "".join(parts)
     
     def compare_with_baseline(
         self,
@@ -507,20 +549,21 @@ class EvalReporter:
         Returns:
             Comparison results
         """
-        with open(baseline_path, 'r') as f:
-            baseline = json.load(f)
+        baseline = orjson.loads(Path(baseline_path).read_bytes())
         
         current_stats = current_report["statistics"]
         baseline_stats = baseline["statistics"]
         
+        current_pass_rate = _report_float(current_stats, "pass_rate")
+        baseline_pass_rate = _report_float(baseline_stats, "pass_rate")
         comparison = {
-            "pass_rate_change": current_stats["pass_rate"] - baseline_stats["pass_rate"],
+            "pass_rate_change": current_pass_rate - baseline_pass_rate,
             "accuracy_change": (
-                current_stats.get("average_score_accuracy", 0) - 
-                baseline_stats.get("average_score_accuracy", 0)
+                _report_float(current_stats, "average_score_accuracy") - 
+                _report_float(baseline_stats, "average_score_accuracy")
             ),
-            "regression": current_stats["pass_rate"] < baseline_stats["pass_rate"] * 0.95,
-            "improvement": current_stats["pass_rate"] > baseline_stats["pass_rate"] * 1.05
+            "regression": current_pass_rate < baseline_pass_rate * 0.95,
+            "improvement": current_pass_rate > baseline_pass_rate * 1.05
         }
         
         return comparison
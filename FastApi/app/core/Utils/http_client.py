@@ -0,0 +1,97 @@
+"""Process-wide shared httpx.AsyncClient for outbound API calls.
+
+Reusing one pooled client keeps TLS connections to api.github.com alive across
+requests instead of paying a fresh handshake per analysis.
+
+The client's connection pool is bound to the event loop it was created on, so a new client
+is built whenever get_client() runs on a different loop (e.g. successive asyncio.run() calls
+in scripts and tests).
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+HTTP_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+DEFAULT_HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "User-Agent": "fastapi/1.0",
+}
+
+ETAG_CACHE_MAXSIZE = 10_000
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+# (url, params, authorization, accept) -> (etag, decoded body, content-type); LRU-ordered
+_etag_cache: "OrderedDict[Tuple[str, str, str, str], Tuple[str, bytes, str]]" = OrderedDict()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it lazily on first use (per event loop)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # A client left behind by a finished loop cannot be closed from here; it is dropped
+        _client_loop = loop
+        _client = httpx.AsyncClient(
+            timeout=30,
+            headers=DEFAULT_HEADERS,
+            http2=True,
+            limits=HTTP_LIMITS,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared AsyncClient (called on application shutdown)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def cached_get(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> httpx.Response:
+    """GET with ETag revalidation.
+
+    Sends If-None-Match for URLs seen before; on 304 the cached body is replayed
+    as a 200 response so callers can keep using is_success/json()/raise_for_status().
+    GitHub does not count 304 responses against the rate limit.
+    """
+    headers = dict(headers or {})
+    key = (
+        url,
+        repr(sorted((params or {}).items())),
+        headers.get("Authorization", ""),
+        headers.get("Accept", ""),
+    )
+    cached = _etag_cache.get(key)
+    if cached is not None:
+        headers["If-None-Match"] = cached[0]
+
+    resp = await client.get(url, headers=headers, params=params)
+
+    if resp.status_code == 304 and cached is not None:
+        _etag_cache.move_to_end(key)
+        # Body is stored already decoded, so only replay content-type (not content-encoding)
+        return httpx.Response(
+            200,
+            content=cached[1],
+            headers={"Content-Type": cached[2], "ETag": cached[0]},
+            request=resp.request,
+        )
+
+    etag = resp.headers.get("ETag")
+    if resp.is_success and etag:
+        _etag_cache[key] = (etag, resp.content, resp.headers.get("Content-Type", "application/json"))
+        _etag_cache.move_to_end(key)
+        if len(_etag_cache) > ETAG_CACHE_MAXSIZE:
+            _etag_cache.popitem(last=False)
+    return resp
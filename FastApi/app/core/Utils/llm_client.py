@@ -1,4 +1,4 @@
-import os, httpx, json
+import asyncio, os, httpx, json
 from dotenv import load_dotenv
 import google.generativeai as genai
 
@@ -11,6 +11,52 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 HF_API_KEY = os.getenv("HF_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# One pooled AsyncGroq client per process: back-to-back calls (e.g. UML generate + repair)
+# reuse a warm HTTP/2 connection instead of paying TCP+TLS setup each time. The pool is bound
+# to the event loop it was created on, so the client is rebuilt when the running loop changes.
+GROQ_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=32)
+GROQ_SYSTEM_PROMPT = (
+    "You are an expert AI that always follows instructions exactly, "
+    "returns strict JSON when requested, and never includes extra words."
+)
+
+_groq_client = None
+_groq_client_loop = None
+
+class LLMUnavailableError(RuntimeError):
+    """Raised by the streaming helpers when the provider has no API key configured."""
+
+def _get_groq_client():
+    """Return the shared AsyncGroq client, creating it lazily on first use (per event loop)."""
+    global _groq_client, _groq_client_loop
+    loop = asyncio.get_running_loop()
+    if _groq_client is None or _groq_client.is_closed() or _groq_client_loop is not loop:
+        _groq_client_loop = loop
+        from groq import AsyncGroq, DefaultAsyncHttpxClient
+        _groq_client = AsyncGroq(
+            api_key=GROQ_API_KEY,
+            http_client=DefaultAsyncHttpxClient(http2=True, limits=GROQ_HTTP_LIMITS),
+        )
+    return _groq_client
+
+async def close_llm_clients():
+    """Close pooled LLM provider clients (called on application shutdown)."""
+    global _groq_client, _groq_client_loop
+    if (
+        _groq_client is not None
+        and not _groq_client.is_closed()
+        and _groq_client_loop is asyncio.get_running_loop()
+    ):
+        await _groq_client.close()
+    _groq_client = None
+    _groq_client_loop = None
+
+def _groq_messages(prompt):
+    return [
+        {"role": "system", "content": GROQ_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
 async def call_chat(prompt, model=None, max_tokens=800, temperature=0.7):
     """
     Call LLM based on configured provider.
@@ -52,24 +98,9 @@ async def _call_groq(prompt, model, max_tokens, temperature):
         return _mock_response()
     
     try:
-        from groq import Groq
-        client = Groq(api_key=GROQ_API_KEY)
-
-        response = client.chat.completions.create(
+        response = await _get_groq_client().chat.completions.create(
             model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert AI that always follows instructions exactly, "
-                        "returns strict JSON when requested, and never includes extra words."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            messages=_groq_messages(prompt),
             max_tokens=max_tokens,
             temperature=temperature
         )
@@ -81,6 +112,30 @@ async def _call_groq(prompt, model, max_tokens, temperature):
         print(f"Groq API error: {e}")
         return _mock_response()
 
+async def _call_groq_stream(prompt, model, max_tokens, temperature):
+    """Stream a Groq completion, yielding text deltas as they arrive.
+
+    Never yields the mock payload: a missing key raises LLMUnavailableError and provider
+    errors propagate, so the caller decides whether to fall back.
+    """
+    if not GROQ_API_KEY:
+        raise LLMUnavailableError("GROQ_API_KEY not set")
+
+    stream = await _get_groq_client().chat.completions.create(
+        model=model,
+        messages=_groq_messages(prompt),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Closing early (caller stopped reading) drops the HTTP stream instead of draining it
+        await stream.close()
+
 async def _call_gemini(prompt, model, max_tokens, temperature):
     """Call Google Gemini API."""
     if not GEMINI_API_KEY:
@@ -123,6 +178,31 @@ async def _call_gemini(prompt, model, max_tokens, temperature):
         traceback.print_exc()
         return _mock_response()
 
+async def _call_gemini_stream(prompt, model, max_tokens, temperature):
+    """Stream a Gemini completion, yielding text chunks as they arrive.
+
+    Never yields the mock payload: a missing key raises LLMUnavailableError and provider
+    errors propagate, so the caller decides whether to fall back.
+    """
+    if not GEMINI_API_KEY:
+        raise LLMUnavailableError("GEMINI_API_KEY not set")
+
+    genai.configure(api_key=GEMINI_API_KEY)
+    gemini_model = genai.GenerativeModel(model)
+    response = await gemini_model.generate_content_async(
+        prompt,
+        generation_config=genai.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            response_mime_type="application/json",  # enforce JSON-only output
+        ),
+        stream=True,
+    )
+    async for chunk in response:
+        # chunk.text raises ValueError on chunks without parts (safety-blocked or final chunks)
+        if chunk.parts and chunk.text:
+            yield chunk.text
+
 async def _call_huggingface(prompt, model, max_tokens, temperature):
     """Call HuggingFace Inference API."""
     if not HF_API_KEY:
@@ -150,9 +230,15 @@ async def _call_huggingface(prompt, model, max_tokens, temperature):
         print(f"HF API error: {e}")
         return _mock_response()
 
+_MOCK_RESPONSE = json.dumps({
+    "recommended_learning_path": ["Learn the missing technologies", "Build a project"],
+    "final_summary": "Focus on hands-on practice"
+})
+
 def _mock_response() -> str:
     """Fallback mock response."""
-    return json.dumps({
-        "recommended_learning_path": ["Learn the missing technologies", "Build a project"],
-        "final_summary": "Focus on hands-on practice"
-    })
\ No newline at end of file
+    return _MOCK_RESPONSE
+
+def is_mock_response(text) -> bool:
+    """True if text is the fallback payload returned on missing keys or provider errors."""
+    return text == _MOCK_RESPONSE
\ No newline at end of file
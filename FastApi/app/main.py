@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import github
@@ -6,6 +7,10 @@ from app.routers import authenticity
 from app.routers import security
 from app.routers import uml
 from app.routers import learning
+from app.core.Utils.http_client import get_client, close_client
+from app.core.Utils.llm_client import close_llm_clients
+from app.core.Agents.learning_agent import seed_learning_collection
+from app.core.Agents.uml_agent import warm_uml_retrieval
 
 app = FastAPI(
     title="Mirai Hackathon API",
@@ -29,6 +34,31 @@ app.include_router(security.router, prefix="/api")
 app.include_router(uml.router, prefix="/api")
 app.include_router(learning.router)
 
+@app.on_event("startup")
+async def startup_http_client():
+    """Open the shared outbound HTTP client"""
+    get_client()
+
+@app.on_event("startup")
+async def warm_learning_collection():
+    """Seed the learning knowledge collection once at boot (off the event loop)"""
+    await asyncio.to_thread(seed_learning_collection)
+
+@app.on_event("startup")
+async def warm_uml_collection():
+    """Seed the UML knowledge index and load the encoder before the first request"""
+    await asyncio.to_thread(warm_uml_retrieval)
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Close the shared outbound HTTP client"""
+    await close_client()
+
+@app.on_event("shutdown")
+async def shutdown_llm_clients():
+    """Close pooled LLM provider clients"""
+    await close_llm_clients()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
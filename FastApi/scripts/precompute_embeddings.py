@@ -0,0 +1,44 @@
+"""Precompute seed embeddings for every RAG knowledge base.
+
+Writes data/<name>_emb_<digest>.npy (digest over backend, model and corpus) and fills the
+per-text embedding cache in data/rag_cache.db. data/ is the runtime data directory and is
+not tracked, so the app only starts without running the embedding model when these files
+are present at runtime (e.g. baked into the image or on a mounted volume). Run from the
+FastApi directory:
+
+    python scripts/precompute_embeddings.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.RAGANDEMBEDDINGS.embeddings import load_seed_embeddings
+from app.core.RAGANDEMBEDDINGS.ats_data import ats_data
+from app.core.RAGANDEMBEDDINGS.authenticity_rag_data import authenticity_knowledge
+from app.core.RAGANDEMBEDDINGS.github_rag_data import github_knowledge
+from app.core.RAGANDEMBEDDINGS.learning_rag_data import learning_knowledge
+from app.core.RAGANDEMBEDDINGS.security_rag_data import security_knowledge
+from app.core.RAGANDEMBEDDINGS.uml_rag_data import uml_knowledge
+
+# Names match the collection names the agents seed, so the files are picked up at runtime
+KNOWLEDGE_BASES = {
+    "ats_knowledge": ats_data,
+    "authenticity_knowledge": authenticity_knowledge,
+    "github_knowledge": github_knowledge,
+    "learning_knowledge": learning_knowledge,
+    "security_knowledge": security_knowledge,
+    "uml_knowledge": uml_knowledge,
+}
+
+
+def main():
+    for name, items in KNOWLEDGE_BASES.items():
+        emb = load_seed_embeddings(name, items)
+        print(f"✅ {name}: {emb.shape[0]} x {emb.shape[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
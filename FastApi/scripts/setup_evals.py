@@ -11,7 +11,6 @@ def check_dependencies():
     required = [
         'pytest',
         'pytest_asyncio',
-        'sklearn',
         'numpy',
         'pandas'
     ]
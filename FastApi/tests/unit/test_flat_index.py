@@ -0,0 +1,65 @@
+"""
+Unit tests for the in-memory flat inner-product index
+
+Tests that quantize_int8 round-trips within half a quantization step per
+element, and that topk_ip returns the best rows first for float32 and
+int8 matrices, clamping k to the number of rows.
+"""
+
+import numpy as np
+
+from app.core.RAGANDEMBEDDINGS.flat_index import quantize_int8, topk_ip
+
+
+def _unit_rows(rng, n, dim=32):
+    m = rng.standard_normal((n, dim)).astype(np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+class TestQuantizeInt8:
+    """Test suite for quantize_int8."""
+
+    def test_round_trip_error_is_bounded(self):
+        """Dequantized values are within half a step (scale / 2) of the original."""
+        matrix = _unit_rows(np.random.default_rng(0), 20)
+        quantized, scales = quantize_int8(matrix)
+        assert quantized.dtype == np.int8 and scales.dtype == np.float32
+        assert quantized.shape == matrix.shape and scales.shape == (20,)
+        error = np.abs(quantized * scales[:, None] - matrix)
+        assert np.all(error <= scales[:, None] / 2 + 1e-6)
+        # Each row's largest magnitude maps to +/-127
+        assert np.all(np.abs(quantized).max(axis=1) == 127)
+
+    def test_zero_row(self):
+        """An all-zero row gets scale 1 instead of dividing by zero."""
+        quantized, scales = quantize_int8(np.zeros((2, 4), dtype=np.float32))
+        assert np.all(quantized == 0)
+        assert np.all(scales == 1.0)
+
+
+class TestTopkIp:
+    """Test suite for topk_ip."""
+
+    def test_matches_full_sort(self):
+        """Top-k indices equal the head of a full descending sort, best first."""
+        rng = np.random.default_rng(1)
+        for _ in range(20):
+            matrix = _unit_rows(rng, 50)
+            q = _unit_rows(rng, 1)[0]
+            expected = np.argsort(-(matrix @ q), kind="stable")[:5]
+            assert topk_ip(matrix, q, 5).tolist() == expected.tolist()
+
+    def test_k_is_clamped(self):
+        """k larger than the corpus returns every row; k == 0 returns nothing."""
+        matrix = _unit_rows(np.random.default_rng(2), 3)
+        assert sorted(topk_ip(matrix, matrix[0], 10).tolist()) == [0, 1, 2]
+        assert topk_ip(matrix, matrix[0], 10)[0] == 0
+        assert topk_ip(matrix, matrix[0], 0).size == 0
+
+    def test_int8_ranking_follows_float_scores(self):
+        """With row scales applied, the int8 index finds the query's own row first."""
+        rng = np.random.default_rng(3)
+        matrix = _unit_rows(rng, 100, dim=384)
+        quantized, scales = quantize_int8(matrix)
+        for row in (0, 17, 99):
+            assert topk_ip(quantized, matrix[row], 3, scales)[0] == row
@@ -0,0 +1,44 @@
+"""
+Unit tests for GitHub repository reference parsing (parse_owner_repo)
+
+Tests that HTTPS/SSH URLs and bare slugs normalize to (owner, repo),
+extra path segments and query strings are ignored, and malformed
+input raises ValueError.
+"""
+
+import pytest
+
+from app.core.Agents.github_agent import parse_owner_repo
+
+
+class TestParseOwnerRepo:
+    """Test suite for parse_owner_repo."""
+
+    @pytest.mark.parametrize("reference", [
+        "https://github.com/octocat/hello-world",
+        "http://github.com/octocat/hello-world",
+        "https://www.github.com/octocat/hello-world",
+        "github.com/octocat/hello-world",
+        "https://github.com/octocat/hello-world.git",
+        "git://github.com/octocat/hello-world.git",
+        "git@github.com:octocat/hello-world.git",
+        "octocat/hello-world",
+        "  octocat/hello-world  ",
+        "https://github.com/octocat/hello-world/tree/main/src",
+        "https://github.com/octocat/hello-world?tab=readme",
+        "https://github.com/octocat/hello-world#readme",
+    ])
+    def test_supported_forms(self, reference):
+        """Every supported reference form yields the same owner and repo."""
+        assert parse_owner_repo(reference) == ("octocat", "hello-world")
+
+    def test_dotted_repo_name_keeps_inner_dots(self):
+        """Only a trailing .git is stripped."""
+        assert parse_owner_repo("octocat/my.repo.js") == ("octocat", "my.repo.js")
+        assert parse_owner_repo("octocat/my.repo.js.git") == ("octocat", "my.repo.js")
+
+    @pytest.mark.parametrize("reference", ["", "   ", "octocat", "octocat/", "octocat/.git"])
+    def test_invalid_references(self, reference):
+        """Missing owner/repo parts raise ValueError (mapped to HTTP 400 by callers)."""
+        with pytest.raises(ValueError):
+            parse_owner_repo(reference)
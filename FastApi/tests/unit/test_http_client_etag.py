@@ -0,0 +1,101 @@
+"""
+Unit tests for the ETag-revalidating GET helper in app.core.Utils.http_client
+
+Tests that cached_get:
+1. Sends If-None-Match for URLs it has seen before
+2. Replays the cached body as a 200 when GitHub answers 304
+3. Keys the cache on params and Authorization
+4. Evicts the least recently used entry once the cache is full
+"""
+
+import httpx
+import pytest
+
+from app.core.Utils import http_client
+from app.core.Utils.http_client import cached_get
+
+
+@pytest.fixture(autouse=True)
+def empty_etag_cache():
+    http_client._etag_cache.clear()
+    yield
+    http_client._etag_cache.clear()
+
+
+def _etag_server(seen):
+    """Fake GitHub: ETag is derived from the URL and 304 is returned on a matching If-None-Match."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        etag = f'"{request.url.path}?{request.url.query.decode()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(
+            200,
+            json={"path": request.url.path},
+            headers={"ETag": etag, "Content-Type": "application/json; charset=utf-8"},
+        )
+    return handler
+
+
+class TestCachedGet:
+    """Test suite for cached_get."""
+
+    @pytest.mark.asyncio
+    async def test_304_replays_cached_body(self):
+        """A revalidated response looks like the original 200 to callers."""
+        seen = []
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_etag_server(seen))) as client:
+            first = await cached_get(client, "https://api.github.com/repos/o/r")
+            second = await cached_get(client, "https://api.github.com/repos/o/r")
+
+        assert "If-None-Match" not in seen[0].headers
+        assert seen[1].headers["If-None-Match"] == first.headers["ETag"]
+        assert second.status_code == 200
+        assert second.is_success
+        assert second.json() == first.json() == {"path": "/repos/o/r"}
+        assert second.headers["Content-Type"].startswith("application/json")
+
+    @pytest.mark.asyncio
+    async def test_cache_key_includes_params_and_auth(self):
+        """Different params or tokens never revalidate against each other's ETag."""
+        seen = []
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_etag_server(seen))) as client:
+            url = "https://api.github.com/users/u/repos"
+            await cached_get(client, url, params={"per_page": 100})
+            await cached_get(client, url, params={"per_page": 30})
+            await cached_get(client, url, params={"per_page": 100}, headers={"Authorization": "Bearer t"})
+
+        assert all("If-None-Match" not in r.headers for r in seen)
+        assert len(http_client._etag_cache) == 3
+
+    @pytest.mark.asyncio
+    async def test_responses_without_etag_are_not_cached(self):
+        """Nothing is stored when the server sends no ETag or an error status."""
+        def handler(request):
+            if request.url.path == "/missing":
+                return httpx.Response(404, headers={"ETag": '"x"'})
+            return httpx.Response(200, json={})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await cached_get(client, "https://api.github.com/plain")
+            await cached_get(client, "https://api.github.com/missing")
+
+        assert len(http_client._etag_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, monkeypatch):
+        """The least recently used URL is evicted; a 304 refreshes an entry's recency."""
+        monkeypatch.setattr(http_client, "ETAG_CACHE_MAXSIZE", 2)
+        seen = []
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_etag_server(seen))) as client:
+            await cached_get(client, "https://api.github.com/a")
+            await cached_get(client, "https://api.github.com/b")
+            await cached_get(client, "https://api.github.com/a")  # 304, a becomes most recent
+            await cached_get(client, "https://api.github.com/c")  # evicts b
+
+            cached_urls = [key[0] for key in http_client._etag_cache]
+            assert cached_urls == ["https://api.github.com/a", "https://api.github.com/c"]
+
+            seen.clear()
+            await cached_get(client, "https://api.github.com/b")
+            assert "If-None-Match" not in seen[0].headers
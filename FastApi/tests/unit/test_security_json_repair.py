@@ -0,0 +1,54 @@
+"""
+Unit tests for the local LLM JSON repair in the Security Auditor Agent
+
+Tests that _repair_json recovers near-miss replies (fences, surrounding
+prose, trailing commas) without another LLM round trip, honours braces
+and escaped quotes inside string literals, and returns None when the
+reply cannot be recovered.
+"""
+
+import pytest
+
+from app.core.Agents.security_agent import _outermost_object, _repair_json
+
+
+class TestRepairJson:
+    """Test suite for _repair_json / _outermost_object."""
+
+    def test_fenced_reply(self):
+        """Markdown fences around the object are dropped."""
+        raw = '```json\n{"vulnerabilities": [], "risk_score": 0}\n```'
+        assert _repair_json(raw) == {"vulnerabilities": [], "risk_score": 0}
+
+    def test_prose_around_object(self):
+        """Text before and after the object is ignored."""
+        raw = 'Here is the review:\n{"risk_score": 40, "summary": "ok"}\nLet me know!'
+        assert _repair_json(raw) == {"risk_score": 40, "summary": "ok"}
+
+    def test_trailing_commas(self):
+        """Trailing commas before } or ] are removed when the strict parse fails."""
+        raw = '{"vulnerabilities": [{"issue": "XSS",},], "risk_score": 15,}'
+        assert _repair_json(raw) == {"vulnerabilities": [{"issue": "XSS"}], "risk_score": 15}
+
+    def test_braces_and_quotes_inside_strings(self):
+        """Braces and escaped quotes inside string literals do not end the object early."""
+        raw = 'Result: {"fix_suggestion": "use \\"{}\\".format(x) } carefully", "risk_score": 8} trailing }'
+        assert _repair_json(raw) == {"fix_suggestion": 'use "{}".format(x) } carefully', "risk_score": 8}
+
+    def test_outermost_object_stops_at_balanced_close(self):
+        """Only the first balanced span is sliced, even if more objects follow."""
+        text = 'a {"x": {"y": "}"}} b {"z": 1}'
+        assert _outermost_object(text) == '{"x": {"y": "}"}}'
+
+    @pytest.mark.parametrize("raw", [
+        None,
+        "",
+        "no json here",
+        '{"unterminated": "value',
+        '{"risk_score": 10',
+        "[1, 2, 3]",
+        '{"bad": tru}',
+    ])
+    def test_unrecoverable_returns_none(self, raw):
+        """Replies without a parseable object return None so the caller can fall back."""
+        assert _repair_json(raw) is None
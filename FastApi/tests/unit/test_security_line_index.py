@@ -0,0 +1,59 @@
+"""
+Unit tests for offset -> line number mapping in the Security Auditor Agent
+
+Tests that _LineIndex agrees with counting newlines in the source,
+including non-BMP characters and lone surrogates (offsets are in
+characters, not bytes), and that static findings report correct lines.
+"""
+
+import random
+
+from app.core.Agents.security_agent import _LineIndex, run_static_analysis
+
+
+def _expected_line(code, offset):
+    return code.count("\n", 0, offset) + 1
+
+
+class TestLineIndex:
+    """Test suite for _LineIndex."""
+
+    def test_matches_newline_count(self):
+        """Every offset maps to the same line as a naive newline count."""
+        code = "first\nsecond line\n\nfourth\n"
+        offsets = list(range(len(code) + 1))
+        assert _LineIndex(code).line_numbers(offsets) == [_expected_line(code, o) for o in offsets]
+
+    def test_non_bmp_and_surrogates(self):
+        """Emoji and lone surrogates count as one character each."""
+        code = "a = '\U0001F600'\nb = '\ud800'\nc = 1\n"
+        index = _LineIndex(code)
+        offsets = [code.index("b"), code.index("c"), code.index("\ud800")]
+        assert index.line_numbers(offsets) == [2, 3, 2]
+
+    def test_randomized_against_naive(self):
+        """Random text with mixed characters matches the naive count."""
+        rng = random.Random(1234)
+        alphabet = "ab \n\t{}é\U0001F680"
+        for _ in range(50):
+            code = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+            offsets = [rng.randint(0, len(code)) for _ in range(10)]
+            assert _LineIndex(code).line_numbers(offsets) == [_expected_line(code, o) for o in offsets]
+
+    def test_lines_at_is_sorted_and_distinct(self):
+        """lines_at collapses repeated lines and sorts ascending."""
+        code = "x\ny y\nz\n"
+        offsets = [code.index("z"), code.index("y"), code.rindex("y"), 0]
+        assert _LineIndex(code).lines_at(offsets) == [1, 2, 3]
+
+    def test_empty_inputs(self):
+        """No offsets gives no lines; code without newlines is all line 1."""
+        assert _LineIndex("").line_numbers([]) == []
+        assert _LineIndex("abc").line_numbers([0, 3]) == [1, 1]
+
+    def test_static_findings_report_lines(self):
+        """Line numbers in static findings come from the index."""
+        code = "import os\n\ndef run(cmd):\n    os.system(cmd)\n    eval(cmd)\n"
+        findings = {v["issue"]: v["line_numbers"] for v in run_static_analysis(code)}
+        assert findings["Command Injection (os.system)"] == [4]
+        assert findings["Arbitrary Code Execution (eval)"] == [5]
@@ -0,0 +1,102 @@
+"""
+Unit tests for streamed UML reply parsing
+
+Tests that _ObjectScanner finds complete top-level JSON objects no matter
+how the text is chunked (including escapes split across chunks), and that
+_stream_uml_reply keeps partial output instead of re-requesting when the
+stream breaks.
+"""
+
+import json
+
+import pytest
+
+from app.core.Agents import uml_agent
+from app.core.Agents.uml_agent import _ObjectScanner, _stream_uml_reply
+from app.core.Utils.llm_client import LLMUnavailableError
+
+
+def _scan(chunks):
+    """Push chunks one by one and collect every complete object as text."""
+    scanner = _ObjectScanner()
+    found = []
+    for chunk in chunks:
+        scanner.push(chunk)
+        span = scanner.next_object()
+        while span is not None:
+            found.append(scanner.text[span[0]:span[1]])
+            span = scanner.next_object()
+    return found
+
+
+REPLY = 'Sure! ```json\n{"diagrams": [{"title": "a } \\"quoted\\" {", "mermaid": "x\\\\"}], "n": {"k": 1}}\n``` done'
+OBJECT = REPLY[REPLY.index("{"):REPLY.rindex("}") + 1]
+
+
+class TestObjectScanner:
+    """Test suite for _ObjectScanner."""
+
+    def test_single_chunk(self):
+        """A whole reply yields exactly the embedded object."""
+        assert _scan([REPLY]) == [OBJECT]
+        assert json.loads(OBJECT)["diagrams"][0]["title"] == 'a } "quoted" {'
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+    def test_any_chunking(self, size):
+        """Chunk boundaries (even between a backslash and the quote it escapes) do not matter."""
+        chunks = [REPLY[i:i + size] for i in range(0, len(REPLY), size)]
+        assert _scan(chunks) == [OBJECT]
+
+    def test_incomplete_object_waits_for_more_text(self):
+        """No span is reported until the closing brace arrives."""
+        scanner = _ObjectScanner()
+        scanner.push('{"a": "}')
+        assert scanner.next_object() is None
+        scanner.push('"}')
+        assert scanner.next_object() == (0, 10)
+
+    def test_consecutive_objects(self):
+        """Later objects are found after the first one."""
+        assert _scan(['{"a": 1} junk {"b": "{"}', " {}"]) == ['{"a": 1}', '{"b": "{"}', "{}"]
+
+
+class TestStreamUmlReply:
+    """Test suite for _stream_uml_reply fallbacks."""
+
+    @pytest.mark.asyncio
+    async def test_stops_at_first_valid_object(self, monkeypatch):
+        """Text after the first parseable object is never needed."""
+        async def stream(*args, **kwargs):
+            for piece in ['noise {"diagrams"', ': []}', " trailing prose"]:
+                yield piece
+
+        monkeypatch.setattr(uml_agent, "_call_groq_stream", stream)
+        assert await _stream_uml_reply("prompt") == '{"diagrams": []}'
+
+    @pytest.mark.asyncio
+    async def test_partial_output_is_kept_on_stream_error(self, monkeypatch):
+        """A mid-stream failure returns what arrived instead of issuing a blocking request."""
+        async def stream(*args, **kwargs):
+            yield '{"diagrams": [{"type": "class"'
+            raise RuntimeError("connection reset")
+
+        async def blocking(*args, **kwargs):
+            raise AssertionError("blocking call must not be made")
+
+        monkeypatch.setattr(uml_agent, "_call_groq_stream", stream)
+        monkeypatch.setattr(uml_agent, "_call_groq", blocking)
+        assert await _stream_uml_reply("prompt") == '{"diagrams": [{"type": "class"'
+
+    @pytest.mark.asyncio
+    async def test_unavailable_provider_uses_blocking_client(self, monkeypatch):
+        """Without a key the stream raises and the blocking client decides the fallback."""
+        async def stream(*args, **kwargs):
+            raise LLMUnavailableError("GROQ_API_KEY not set")
+            yield  # pragma: no cover
+
+        async def blocking(*args, **kwargs):
+            return "mock"
+
+        monkeypatch.setattr(uml_agent, "_call_groq_stream", stream)
+        monkeypatch.setattr(uml_agent, "_call_groq", blocking)
+        assert await _stream_uml_reply("prompt") == "mock"